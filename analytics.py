@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Union
+
+from tradebook import TradeBook
+from results_sink import read_results
+
+TRADING_DAYS = 252
+TS_FORMAT = "%Y-%m-%d%H:%M:%S"  # trades are stamped as str(date) + "HH:MM:SS"
+
+
+def _trade_arrays(source: Union[List[TradeBook], pd.DataFrame, str]) -> Dict[str, np.ndarray]:
+    """
+    Flatten a list of TradeBooks (GenericStrategy.all_tradebooks), a results
+    DataFrame or the path of a results parquet file into aligned arrays
+    """
+    if isinstance(source, str):
+        source = read_results(source)
+
+    if isinstance(source, pd.DataFrame):
+        charges = source["charges"] if "charges" in source else pd.Series(0.0, index=source.index)
+        return {
+            "cycle_id": source["cycle_id"].to_numpy(np.int64),
+            "ts": source["ts"].astype(str).to_numpy(),
+            "price": source["price"].to_numpy(np.float64),
+            "qty": source["qty"].to_numpy(np.float64),
+            "charges": charges.fillna(0.0).to_numpy(np.float64),
+            "expiry": source["expiry"].astype(str).to_numpy(),
+        }
+
+    counts = [len(tb.all_trades) for tb in source]
+    trades = [t for tb in source for t in tb.all_trades]
+    return {
+        "cycle_id": np.repeat(np.arange(len(counts), dtype=np.int64), counts),
+        "ts": np.array([t["ts"] for t in trades], dtype=object),
+        "price": np.fromiter((t["price"] for t in trades), np.float64, len(trades)),
+        "qty": np.fromiter((t["qty"] for t in trades), np.float64, len(trades)),
+        "charges": np.fromiter((t.get("charges", 0.0) for t in trades), np.float64, len(trades)),
+        "expiry": np.array([str(t.get("expiry")) for t in trades], dtype=object),
+    }
+
+
+def cycle_table(source) -> pd.DataFrame:
+    """
+    One row per cycle with entry/exit time, expiry, trade count, charges and pnl.
+    Cycle pnl is the cash flow of all of its trades (short = +premium)
+    net of charges when a cost model was used.
+    """
+    a = _trade_arrays(source)
+    if not len(a["cycle_id"]):
+        return pd.DataFrame(columns=["cycle_id", "expiry", "entry_ts", "exit_ts", "n_trades", "charges", "pnl"])
+
+    # Rows of a cycle are contiguous and in time order, so first/last index per cycle is enough
+    cycle_ids, first, counts = np.unique(a["cycle_id"], return_index=True, return_counts=True)
+    last = first + counts - 1
+    inverse = np.searchsorted(cycle_ids, a["cycle_id"])
+    charges = np.bincount(inverse, weights=a["charges"], minlength=len(cycle_ids))
+    pnl = np.bincount(inverse, weights=-a["qty"] * a["price"], minlength=len(cycle_ids)) - charges
+
+    return pd.DataFrame({
+        "cycle_id": cycle_ids,
+        "expiry": a["expiry"][first],
+        "entry_ts": pd.to_datetime(a["ts"][first], format=TS_FORMAT),
+        "exit_ts": pd.to_datetime(a["ts"][last], format=TS_FORMAT),
+        "n_trades": counts,
+        "charges": charges,
+        "pnl": pnl,
+    })
+
+
+def equity_curve(pnl: np.ndarray) -> np.ndarray:
+    """
+    cumulative equity from a pnl series
+    """
+    return np.cumsum(np.asarray(pnl, dtype=np.float64))
+
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """
+    largest peak to trough fall of an equity curve, as a positive number
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return 0.0
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    return float(np.max(peak - equity))
+
+
+def daily_marks(cycles: pd.DataFrame) -> pd.Series:
+    """
+    Daily pnl with each cycle's pnl booked on its exit day, zero on
+    business days without an exit
+    """
+    if cycles.empty:
+        return pd.Series(dtype=np.float64)
+    days = cycles["exit_ts"].to_numpy().astype("datetime64[D]")
+    calendar = np.arange(days.min(), days.max() + np.timedelta64(1, "D"), dtype="datetime64[D]")
+    calendar = calendar[np.is_busday(calendar)]
+    idx = np.searchsorted(calendar, days)
+    daily = np.bincount(idx, weights=cycles["pnl"].to_numpy(np.float64), minlength=len(calendar))
+    return pd.Series(daily, index=pd.DatetimeIndex(calendar))
+
+
+def sharpe(daily: np.ndarray) -> Optional[float]:
+    """
+    annualised sharpe ratio of daily pnl marks
+    """
+    daily = np.asarray(daily, dtype=np.float64)
+    if len(daily) < 2:
+        return None
+    std = daily.std(ddof=1)
+    return float(daily.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else None
+
+
+def sortino(daily: np.ndarray) -> Optional[float]:
+    """
+    annualised sortino ratio of daily pnl marks
+    """
+    daily = np.asarray(daily, dtype=np.float64)
+    if len(daily) < 2:
+        return None
+    downside = np.sqrt(np.mean(np.minimum(daily, 0.0) ** 2))
+    return float(daily.mean() / downside * np.sqrt(TRADING_DAYS)) if downside > 0 else None
+
+
+def breakdown(cycles: pd.DataFrame, by: str = "expiry") -> pd.DataFrame:
+    """
+    Cycle count, total/average pnl and win rate grouped by expiry,
+    weekday (of entry) or entry_time (HH:MM of entry)
+    """
+    if by == "expiry":
+        keys = cycles["expiry"].to_numpy()
+    elif by == "weekday":
+        keys = cycles["entry_ts"].dt.dayofweek.to_numpy()
+    elif by == "entry_time":
+        keys = cycles["entry_ts"].dt.strftime("%H:%M").to_numpy()
+    else:
+        raise ValueError("by must be one of 'expiry', 'weekday', 'entry_time'")
+
+    groups, inverse = np.unique(keys, return_inverse=True)
+    pnl = cycles["pnl"].to_numpy(np.float64)
+    count = np.bincount(inverse, minlength=len(groups))
+    total = np.bincount(inverse, weights=pnl, minlength=len(groups))
+    wins = np.bincount(inverse, weights=(pnl > 0).astype(np.float64), minlength=len(groups))
+    return pd.DataFrame({
+        by: groups,
+        "cycles": count,
+        "pnl": total,
+        "avg_pnl": total / np.maximum(count, 1),
+        "win_rate": wins / np.maximum(count, 1),
+    })
+
+
+def summarize(source, daily: Optional[pd.Series] = None) -> Dict:
+    """
+    Full post-run report for all_tradebooks or a results parquet file.
+    daily can be passed to compute sharpe/sortino on mark-to-market
+    daily pnl instead of pnl booked at cycle exit.
+    """
+    cycles = cycle_table(source)
+    pnl = cycles["pnl"].to_numpy(np.float64)
+    equity = equity_curve(pnl)
+    if daily is None:
+        daily = daily_marks(cycles)
+    daily = np.asarray(daily, dtype=np.float64)
+    return {
+        "cycles": cycles,
+        "equity": equity,
+        "n_cycles": len(cycles),
+        "pnl": float(pnl.sum()),
+        "charges": float(cycles["charges"].sum()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else None,
+        "max_drawdown": max_drawdown(equity),
+        "daily_max_drawdown": max_drawdown(equity_curve(daily)),
+        "sharpe": sharpe(daily),
+        "sortino": sortino(daily),
+        "by_expiry": breakdown(cycles, "expiry"),
+        "by_weekday": breakdown(cycles, "weekday"),
+        "by_entry_time": breakdown(cycles, "entry_time"),
+    }
@@ -0,0 +1,163 @@
+import os
+import re
+import logging
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import date
+from typing import List, Optional
+
+DAY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.parquet$")
+CATALOG_FILE = ".catalog.parquet"
+
+SCHEMA = pa.schema([
+    ("day", pa.string()),
+    ("size", pa.int64()),
+    ("mtime_ns", pa.int64()),
+    ("expiry", pa.string()),
+    ("nearest_expiry", pa.int32()),
+    ("monthly_expiry_number", pa.int32()),
+    ("minute_min", pa.string()),
+    ("minute_max", pa.string()),
+    ("strike_min", pa.float64()),
+    ("strike_max", pa.float64()),
+    ("spot_min", pa.float64()),
+    ("spot_max", pa.float64()),
+    ("rows", pa.int64()),
+    ("row_groups", pa.list_(pa.int32())),  # row groups whose expiry statistics cover this expiry
+])
+
+
+def _expiry_row_groups(path: str) -> List[tuple]:
+    """
+    (row group, min expiry, max expiry) of every row group of a file, from
+    the expiry column's statistics (None when there are none)
+    """
+    meta = pq.ParquetFile(path).metadata
+    col = meta.schema.to_arrow_schema().get_field_index("expiry")
+    ranges = []
+    for i in range(meta.num_row_groups):
+        stats = meta.row_group(i).column(col).statistics if col >= 0 else None
+        if stats is None or not stats.has_min_max:
+            ranges.append((i, None, None))
+        else:
+            ranges.append((i, str(stats.min), str(stats.max)))
+    return ranges
+
+
+def scan_day(path: str) -> pd.DataFrame:
+    """
+    catalog rows of one day file: one per expiry
+    """
+    present = set(pq.read_schema(path).names)
+    rank = "min(nearest_expiry)" if "nearest_expiry" in present else "NULL"
+    monthly = "min(monthly_expiry_number)" if "monthly_expiry_number" in present else "NULL"
+    spot = ("min(spot_price)", "max(spot_price)") if "spot_price" in present else ("NULL", "NULL")
+    df = duckdb.query(
+        f"SELECT CAST(expiry AS VARCHAR) AS expiry, {rank} AS nearest_expiry, {monthly} AS monthly_expiry_number, "
+        f"min(minute) AS minute_min, max(minute) AS minute_max, min(strike) AS strike_min, max(strike) AS strike_max, "
+        f"{spot[0]} AS spot_min, {spot[1]} AS spot_max, count(*) AS rows FROM '{path}' GROUP BY expiry ORDER BY expiry"
+    ).to_df()
+    ranges = _expiry_row_groups(path)
+    df["row_groups"] = [
+        [i for i, lo, hi in ranges if lo is None or lo <= e <= hi] for e in df["expiry"]
+    ]
+    st = os.stat(path)
+    df.insert(0, "day", os.path.basename(path)[:10])
+    df.insert(1, "size", st.st_size)
+    df.insert(2, "mtime_ns", st.st_mtime_ns)
+    return df
+
+
+class DayCatalog:
+    """
+    Per-directory catalog of day metadata (expiries with their nearest and
+    monthly ranks, minute/strike/spot ranges, rows and row groups per
+    expiry) kept in <data_dir>/.catalog.parquet. refresh() rescans only
+    new or changed day files and drops deleted ones; lookups are then
+    in-memory. A file that can't be read is kept as a marker row (no
+    expiry) with its size and mtime, so it is only retried once it changes.
+    """
+
+    def __init__(self, data_dir: str, path: Optional[str] = None, refresh: bool = True):
+        self.data_dir = data_dir
+        self.path = path or os.path.join(data_dir, CATALOG_FILE)
+        self.frame = pd.read_parquet(self.path) if os.path.exists(self.path) else SCHEMA.empty_table().to_pandas()
+        self._days = {}
+        if refresh:
+            self.refresh()
+        else:
+            self._index()
+
+    def _index(self):
+        readable = self.frame[self.frame["expiry"].notna()]
+        self._days = {day: rows.reset_index(drop=True) for day, rows in readable.groupby("day", sort=True)}
+
+    def refresh(self) -> int:
+        """
+        rescan new or changed day files, drop deleted ones and save the
+        catalog if anything changed. Returns the number of files scanned.
+        """
+        on_disk = {}
+        for name in os.listdir(self.data_dir):
+            m = DAY_FILE.match(name)
+            if m:
+                st = os.stat(os.path.join(self.data_dir, name))
+                on_disk[m.group(1)] = (st.st_size, st.st_mtime_ns)
+
+        first = self.frame.drop_duplicates("day")
+        known = {day: (int(size), int(mtime)) for day, size, mtime in zip(first["day"], first["size"], first["mtime_ns"])}
+        stale = [day for day, fp in on_disk.items() if known.get(day) != fp]
+        removed = [day for day in known if day not in on_disk]
+        if not stale and not removed:
+            self._index()
+            return 0
+
+        keep = self.frame[~self.frame["day"].isin(stale + removed)]
+        scanned = []
+        for day in sorted(stale):
+            try:
+                scanned.append(scan_day(os.path.join(self.data_dir, f"{day}.parquet")))
+            except (duckdb.Error, pa.ArrowException, OSError) as e:
+                logging.warning(f"Could not catalog {day}: {e}")
+                size, mtime_ns = on_disk[day]
+                scanned.append(pd.DataFrame([{"day": day, "size": size, "mtime_ns": mtime_ns, "rows": 0, "row_groups": []}]))
+        self.frame = pd.concat([keep] + scanned, ignore_index=True).sort_values(["day", "expiry"], kind="stable")
+        self.frame = self.frame.reset_index(drop=True)
+        table = pa.Table.from_pandas(self.frame, schema=SCHEMA, preserve_index=False)
+        tmp = self.path + ".tmp"
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, self.path)
+        self._index()
+        logging.info(f"Catalog {self.path}: scanned {len(scanned)} files, dropped {len(removed)}")
+        return len(scanned)
+
+    def day(self, day) -> Optional[pd.DataFrame]:
+        """
+        catalog rows of a day (date or "YYYY-MM-DD"), None if there is no file
+        """
+        return self._days.get(str(day)[:10])
+
+    def days(self, start: date, end: date) -> List[str]:
+        """
+        days with a file between start and end, inclusive
+        """
+        lo, hi = str(start), str(end)
+        return [d for d in self._days if lo <= d <= hi]
+
+    def expiries(self, day) -> Optional[List[str]]:
+        rows = self.day(day)
+        return None if rows is None else sorted(rows["expiry"].tolist())
+
+    def expiry_by_rank(self, day, index: int = 1, monthly: bool = False) -> Optional[str]:
+        """
+        the day's expiry of a nearest (or monthly) rank, as
+        GenericStrategy.get_expiry gives it: None unless the day has exactly
+        one nearest expiry and exactly one expiry of that rank
+        """
+        rows = self.day(day)
+        if rows is None or (rows["nearest_expiry"] == 1).sum() != 1:
+            return None
+        match = rows.loc[rows["monthly_expiry_number" if monthly else "nearest_expiry"] == index, "expiry"]
+        return match.iloc[0] if len(match) == 1 else None
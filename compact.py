@@ -0,0 +1,202 @@
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional
+
+DAY_FILE = re.compile(r"^\d{4}-\d{2}-\d{2}\.parquet$")
+MANIFEST = "manifest.json"
+
+# Columns the engine and strategies read; everything else is dropped unless asked for
+ENGINE_COLUMNS = [
+    "minute", "expiry", "strike", "spot_price", "call_close", "put_close",
+    "put_position", "call_position", "tte", "nearest_expiry", "monthly_expiry_number",
+] + [f"{side}_{g}" for side in ("call", "put") for g in ("iv", "delta", "gamma", "theta", "vega")]
+SMALL_INTS = {"put_position": pa.int16(), "call_position": pa.int16(),
+              "nearest_expiry": pa.int16(), "monthly_expiry_number": pa.int16()}
+DICTIONARY = ("minute", "expiry")
+
+
+def _target_type(name: str, typ: pa.DataType, float_type: pa.DataType) -> pa.DataType:
+    if name in SMALL_INTS and pa.types.is_integer(typ):
+        return SMALL_INTS[name]
+    if name == "strike" and (pa.types.is_integer(typ) or pa.types.is_floating(typ)):
+        return pa.int32()
+    if pa.types.is_floating(typ):
+        return float_type
+    if pa.types.is_large_string(typ):
+        return pa.string()
+    return typ
+
+
+def compact_table(table: pa.Table, columns: Optional[List[str]] = ENGINE_COLUMNS, float_type=pa.float32()) -> pa.Table:
+    """
+    Keep the given columns (all if None), downcast floats to float_type,
+    strikes to int32 and ranks/positions to int16, and sort by
+    (expiry, minute, strike)
+    """
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    fields = []
+    arrays = []
+    for name, col in zip(table.column_names, table.columns):
+        typ = _target_type(name, col.type, float_type)
+        if typ != col.type:
+            if name == "strike" and pa.types.is_floating(col.type):
+                col = pc.round(col)
+            col = col.cast(typ)
+        arrays.append(col)
+        fields.append(pa.field(name, typ))
+    table = pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+    keys = [k for k in ("expiry", "minute", "strike") if k in table.column_names]
+    return table.sort_by([(k, "ascending") for k in keys])
+
+
+def compact_frame(df: pd.DataFrame, float_dtype="float32") -> pd.DataFrame:
+    """
+    compact_table for a loaded frame: floats to float_dtype, strikes to
+    int32, ranks/positions to int16 and minute/expiry to ordered
+    categoricals (int16 codes over the day's distinct values, which still
+    compare and sort as the original strings)
+    """
+    out = {}
+    for name, col in df.items():
+        if name in DICTIONARY and not isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(pd.CategoricalDtype(np.sort(col.dropna().unique().astype(str)), ordered=True))
+        elif name in SMALL_INTS and pd.api.types.is_integer_dtype(col.dtype):
+            col = col.astype(np.int16)
+        elif name == "strike" and pd.api.types.is_numeric_dtype(col.dtype) and not col.isna().any():
+            col = col.round().astype(np.int32)
+        elif pd.api.types.is_float_dtype(col.dtype):
+            col = col.astype(float_dtype)
+        out[name] = col
+    return pd.DataFrame(out, index=df.index)
+
+
+def _row_groups(table: pa.Table, minutes_per_group: int) -> List[slice]:
+    """
+    row ranges that each hold one expiry and at most minutes_per_group
+    consecutive minutes
+    """
+    expiry = table.column("expiry").to_pylist()
+    minute = table.column("minute").to_pylist()
+    bounds = [0]
+    count = 0
+    for i in range(1, len(expiry)):
+        if minute[i] != minute[i - 1]:
+            count += 1
+        if expiry[i] != expiry[i - 1] or count >= minutes_per_group:
+            bounds.append(i)
+            count = 0
+    bounds.append(len(expiry))
+    return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def compact_file(src: str, dst: str, columns: Optional[List[str]] = ENGINE_COLUMNS, float_type=pa.float32(),
+                 minutes_per_group: int = 75, compression_level: int = 6) -> Dict:
+    """
+    Rewrite one day's chain sorted by (expiry, minute, strike), in row groups
+    aligned to expiry and minute ranges, dictionary encoded expiry/minute,
+    ZSTD compressed. Returns the file's manifest entry.
+    """
+    table = compact_table(pq.read_table(src), columns, float_type)
+    groups = _row_groups(table, minutes_per_group) if {"expiry", "minute"} <= set(table.column_names) else [slice(0, table.num_rows)]
+    tmp = dst + ".tmp"
+    with pq.ParquetWriter(tmp, table.schema, compression="zstd", compression_level=compression_level,
+                          use_dictionary=[c for c in DICTIONARY if c in table.column_names],
+                          write_statistics=True) as writer:
+        for g in groups:
+            part = table.slice(g.start, g.stop - g.start)
+            writer.write_table(part, row_group_size=part.num_rows)
+    os.replace(tmp, dst)
+
+    st = os.stat(src)
+    row_groups = []
+    meta = pq.ParquetFile(dst).metadata
+    for i, g in enumerate(groups):
+        part = table.slice(g.start, g.stop - g.start)
+        rg = meta.row_group(i)
+        row_groups.append({
+            "expiry": part.column("expiry")[0].as_py() if "expiry" in table.column_names else None,
+            "minute_min": part.column("minute")[0].as_py() if "minute" in table.column_names else None,
+            "minute_max": part.column("minute")[-1].as_py() if "minute" in table.column_names else None,
+            "rows": rg.num_rows,
+            "offset": rg.column(0).file_offset,
+            "bytes": rg.total_byte_size,
+        })
+    return {
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        "rows": table.num_rows,
+        "bytes": os.path.getsize(dst),
+        "columns": table.column_names,
+        "row_groups": row_groups,
+    }
+
+
+def compact_dir(src_dir: str, dst_dir: str, columns: Optional[List[str]] = ENGINE_COLUMNS, float_type=pa.float32(),
+                minutes_per_group: int = 75, compression_level: int = 6, force: bool = False) -> Dict:
+    """
+    Compact every {date}.parquet of src_dir into dst_dir and write
+    dst_dir/manifest.json. Files whose source is unchanged since the last
+    run are skipped unless force; compacted days whose source is gone are
+    deleted with their manifest entry.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    manifest_path = os.path.join(dst_dir, MANIFEST)
+    manifest = {"version": 1, "files": {}}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    settings = {"columns": columns, "float_type": str(float_type), "minutes_per_group": minutes_per_group}
+    if manifest.get("settings") != settings:
+        manifest["files"] = {}
+    manifest["settings"] = settings
+
+    sources = {name for name in os.listdir(src_dir) if DAY_FILE.match(name)}
+    for name in sorted(os.listdir(dst_dir)):
+        if DAY_FILE.match(name) and name not in sources:
+            os.remove(os.path.join(dst_dir, name))
+            logging.info(f"Removed {name} from {dst_dir}: its source is gone")
+    for name in [n for n in manifest["files"] if n not in sources]:
+        del manifest["files"][name]
+
+    for name in sorted(sources):
+        src = os.path.join(src_dir, name)
+        dst = os.path.join(dst_dir, name)
+        st = os.stat(src)
+        entry = manifest["files"].get(name)
+        if (entry and os.path.exists(dst) and entry["source_size"] == st.st_size
+                and entry["source_mtime_ns"] == st.st_mtime_ns):
+            continue
+        manifest["files"][name] = compact_file(src, dst, columns, float_type, minutes_per_group, compression_level)
+        logging.info(f"Compacted {src}: {st.st_size} -> {manifest['files'][name]['bytes']} bytes")
+
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, manifest_path)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrite daily option chains into the engine's parquet layout")
+    parser.add_argument("src_dir")
+    parser.add_argument("dst_dir")
+    parser.add_argument("--all-columns", action="store_true", help="keep every column, not only the engine's")
+    parser.add_argument("--float64", action="store_true", help="keep float64 prices and greeks")
+    parser.add_argument("--minutes-per-group", type=int, default=75)
+    parser.add_argument("--level", type=int, default=6, help="ZSTD compression level")
+    parser.add_argument("--force", action="store_true", help="rewrite files even if unchanged")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    m = compact_dir(args.src_dir, args.dst_dir, None if args.all_columns else ENGINE_COLUMNS,
+                    pa.float64() if args.float64 else pa.float32(), args.minutes_per_group, args.level, args.force)
+    print(f"{len(m['files'])} files in {os.path.join(args.dst_dir, MANIFEST)}", file=sys.stderr)
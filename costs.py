@@ -0,0 +1,94 @@
+import numpy as np
+from typing import Dict, Optional
+
+
+class CostModel:
+    """
+    Array based transaction cost and slippage model, applied to a batch of
+    fills at once.
+
+    Slippage moves the fill against us (buys pay more, sells get less) by
+        slippage_abs + price * slippage_pct * (1 + moneyness_scale * |strike / spot - 1|)
+        + spread_fraction * spread (when the bar has a spread column)
+    Charges are computed on premium turnover (price * |qty| * lot_size):
+    flat brokerage per order, STT on sells, exchange and SEBI fees on both
+    sides, stamp duty on buys and GST on brokerage + exchange + SEBI.
+    Default rates are NSE index options; brokerage defaults to 0 because
+    quantities in this repo are usually per unit rather than per lot.
+
+    Subclass and override slippage/charges for a different market.
+    """
+
+    def __init__(
+        self,
+        brokerage_per_order: float = 0.0,
+        stt_sell_pct: float = 0.001,
+        exchange_pct: float = 0.0003503,
+        sebi_pct: float = 0.000001,
+        stamp_buy_pct: float = 0.00003,
+        gst_pct: float = 0.18,
+        slippage_abs: float = 0.0,
+        slippage_pct: float = 0.0,
+        moneyness_scale: float = 0.0,
+        spread_fraction: float = 0.0,
+        lot_size: int = 1,
+        spread_columns=("call_spread", "put_spread"),
+    ):
+        self.brokerage_per_order = brokerage_per_order
+        self.stt_sell_pct = stt_sell_pct
+        self.exchange_pct = exchange_pct
+        self.sebi_pct = sebi_pct
+        self.stamp_buy_pct = stamp_buy_pct
+        self.gst_pct = gst_pct
+        self.slippage_abs = slippage_abs
+        self.slippage_pct = slippage_pct
+        self.moneyness_scale = moneyness_scale
+        self.spread_fraction = spread_fraction
+        self.lot_size = lot_size
+        self.spread_columns = spread_columns
+
+    def slippage(self, price: np.ndarray, strike: Optional[np.ndarray] = None,
+                 spot: Optional[np.ndarray] = None, spread: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        slippage per unit, always >= 0
+        """
+        pct = np.full(price.shape, self.slippage_pct)
+        if self.moneyness_scale and strike is not None and spot is not None:
+            pct = pct * (1.0 + self.moneyness_scale * np.abs(strike / spot - 1.0))
+        slip = self.slippage_abs + price * pct
+        if self.spread_fraction and spread is not None:
+            slip = slip + self.spread_fraction * np.nan_to_num(spread)
+        return np.maximum(slip, 0.0)
+
+    def charges(self, price: np.ndarray, qty: np.ndarray, is_buy: np.ndarray) -> np.ndarray:
+        """
+        statutory charges and brokerage per fill, in premium currency
+        """
+        turnover = price * np.abs(qty) * self.lot_size
+        brokerage = np.where(qty != 0, self.brokerage_per_order, 0.0)
+        exchange = turnover * self.exchange_pct
+        sebi = turnover * self.sebi_pct
+        stt = np.where(is_buy, 0.0, turnover * self.stt_sell_pct)
+        stamp = np.where(is_buy, turnover * self.stamp_buy_pct, 0.0)
+        gst = (brokerage + exchange + sebi) * self.gst_pct
+        return brokerage + exchange + sebi + stt + stamp + gst
+
+    def apply(self, prices, qtys, is_buy, strike=None, spot=None, spread=None) -> Dict[str, np.ndarray]:
+        """
+        Fill prices, slippage and charges for a batch of fills at raw prices
+        """
+        price = np.asarray(prices, dtype=np.float64)
+        qty = np.asarray(qtys, dtype=np.float64)
+        is_buy = np.asarray(is_buy, dtype=bool)
+        strike = np.asarray(strike, dtype=np.float64) if strike is not None else None
+        spot = np.asarray(spot, dtype=np.float64) if spot is not None else None
+        spread = np.asarray(spread, dtype=np.float64) if spread is not None else None
+
+        slip = self.slippage(price, strike, spot, spread)
+        fill = np.where(is_buy, price + slip, np.maximum(price - slip, 0.0))
+        return {
+            "price": fill,
+            "raw_price": price,
+            "slippage": np.abs(fill - price),
+            "charges": self.charges(fill, qty, is_buy),
+        }
@@ -1,6 +1,11 @@
+import os
 import sqlite3
+import json
 from datetime import datetime, date
 import pandas as pd
+import duckdb
+import pyarrow as pa
+import pyarrow.dataset as ds
 
 class TradeDB:
     def __init__(self, db_path="trades.db"):
@@ -27,15 +32,237 @@ class TradeDB:
             pnl REAL,
             pnl_pct REAL,
             status TEXT,
-            exit_reason TEXT
+            exit_reason TEXT,
+            run_id INTEGER REFERENCES runs(run_id),
+            cycle_id INTEGER,
+            charges REAL
         )
         """)
-        
+
+        # Older databases were created before runs, cycle ids and charges existed
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(trades)")]
+        if "run_id" not in columns:
+            cursor.execute("ALTER TABLE trades ADD COLUMN run_id INTEGER REFERENCES runs(run_id)")
+        if "cycle_id" not in columns:
+            cursor.execute("ALTER TABLE trades ADD COLUMN cycle_id INTEGER")
+        if "charges" not in columns:
+            cursor.execute("ALTER TABLE trades ADD COLUMN charges REAL")
+
+        # One row per backtest run, summary columns filled on ingest
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            strategy TEXT,
+            start_date DATE,
+            end_date DATE,
+            created_at TIMESTAMP,
+            n_cycles INTEGER,
+            n_trades INTEGER,
+            pnl REAL,
+            max_drawdown REAL,
+            win_rate REAL
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS run_params (
+            run_id INTEGER REFERENCES runs(run_id),
+            key TEXT,
+            value TEXT,
+            PRIMARY KEY (run_id, key)
+        )
+        """)
+
+        # High-water mark per export destination for incremental parquet exports
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS exports (
+            out_dir TEXT PRIMARY KEY,
+            last_trade_id INTEGER,
+            exported_at TIMESTAMP
+        )
+        """)
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_run_id ON trades (run_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_pnl ON runs (pnl DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_max_drawdown ON runs (max_drawdown, pnl)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_runs_strategy ON runs (strategy, pnl DESC)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_run_params_key_value ON run_params (key, value)")
+
         conn.commit()
         conn.close()
+
+    @staticmethod
+    def _trade_row(trade, run_id=None, cycle_id=None):
+        """Map a TradeBook trade dict onto the trades table columns"""
+        strike = trade.get('strike')
+        return (
+            trade['symbol'],
+            str(trade['expiry']) if trade.get('expiry') is not None else None,
+            float(strike) if strike is not None else None,
+            trade['ts'],
+            float(trade['price']),
+            int(trade['qty']),
+            'OPEN' if trade['order'] == 'S' else 'CLOSED',
+            run_id,
+            cycle_id,
+            float(trade.get('charges') or 0.0),
+        )
+
+    @staticmethod
+    def summarize_tradebooks(tradebooks):
+        """
+        Per-run summary from a list of closed TradeBooks (one per cycle).
+        Cycle pnl is the cash flow of all its trades net of any charges, drawdown is measured
+        on the cumulative cycle pnl and reported as a positive number.
+        """
+        cycle_pnl = [sum(-t['qty'] * t['price'] - t.get('charges', 0.0) for t in tb.all_trades) for tb in tradebooks]
+        equity = peak = max_drawdown = 0.0
+        for pnl in cycle_pnl:
+            equity += pnl
+            peak = max(peak, equity)
+            max_drawdown = max(max_drawdown, peak - equity)
+        return {
+            "n_cycles": len(cycle_pnl),
+            "n_trades": sum(len(tb.all_trades) for tb in tradebooks),
+            "pnl": float(sum(cycle_pnl)),
+            "max_drawdown": float(max_drawdown),
+            "win_rate": sum(1 for p in cycle_pnl if p > 0) / len(cycle_pnl) if cycle_pnl else None,
+        }
+
+    def _insert_run(self, cursor, run):
+        """Insert one run with its params and trades using an open cursor"""
+        tradebooks = run.get('tradebooks') or []
+        summary = self.summarize_tradebooks(tradebooks)
+        cursor.execute("""
+        INSERT INTO runs (
+            name, strategy, start_date, end_date, created_at,
+            n_cycles, n_trades, pnl, max_drawdown, win_rate
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            run.get('name'),
+            run.get('strategy'),
+            str(run['start_date']) if run.get('start_date') else None,
+            str(run['end_date']) if run.get('end_date') else None,
+            datetime.now().isoformat(sep=" ", timespec="seconds"),
+            summary['n_cycles'],
+            summary['n_trades'],
+            summary['pnl'],
+            summary['max_drawdown'],
+            summary['win_rate'],
+        ))
+        run_id = cursor.lastrowid
+
+        params = run.get('params') or {}
+        cursor.executemany(
+            "INSERT INTO run_params (run_id, key, value) VALUES (?, ?, ?)",
+            [(run_id, k, json.dumps(v, default=str)) for k, v in params.items()],
+        )
+        cursor.executemany("""
+        INSERT INTO trades (
+            symbol, expiry, strike, entry_time, entry_price, quantity, status, run_id, cycle_id, charges
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [self._trade_row(t, run_id, cycle_id) for cycle_id, tb in enumerate(tradebooks) for t in tb.all_trades])
+        return run_id
+
+    def save_run(self, tradebooks, strategy=None, start_date=None, end_date=None, params=None, name=None):
+        """Save a single backtest run (e.g. GenericStrategy.all_tradebooks), returns run_id"""
+        run_ids = self.save_runs([{
+            'tradebooks': tradebooks,
+            'strategy': strategy,
+            'start_date': start_date,
+            'end_date': end_date,
+            'params': params,
+            'name': name,
+        }])
+        return run_ids[0] if run_ids else None
+
+    def save_runs(self, runs):
+        """
+        Bulk ingest of many runs from one sweep in a single transaction.
+        Each run is a dict with keys tradebooks, strategy, start_date,
+        end_date, params and name; all but tradebooks are optional.
+        Returns the list of run_ids, or an empty list if nothing was saved.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            run_ids = [self._insert_run(cursor, run) for run in runs]
+            conn.commit()
+            return run_ids
+        except Exception as e:
+            print(f"Error saving runs: {e}")
+            conn.rollback()
+            return []
+        finally:
+            conn.close()
+
+    def get_runs(self, run_ids=None):
+        """Get run summary rows, optionally restricted to the given run_ids"""
+        conn = sqlite3.connect(self.db_path)
+        query = "SELECT * FROM runs"
+        params = []
+        if run_ids:
+            query += f" WHERE run_id IN ({','.join('?' * len(run_ids))})"
+            params = list(run_ids)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+
+    def get_run_params(self, run_ids=None):
+        """Get run parameters pivoted to one row per run and one column per key"""
+        conn = sqlite3.connect(self.db_path)
+        query = "SELECT run_id, key, value FROM run_params"
+        params = []
+        if run_ids:
+            query += f" WHERE run_id IN ({','.join('?' * len(run_ids))})"
+            params = list(run_ids)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        if df.empty:
+            return pd.DataFrame(index=pd.Index([], name="run_id"))
+        df["value"] = df["value"].map(json.loads)
+        return df.pivot(index="run_id", columns="key", values="value")
+
+    def top_runs(self, n=20, max_drawdown=None, strategy=None):
+        """
+        Best runs by pnl, e.g. top 20 with max drawdown below X.
+        Served by idx_runs_pnl / idx_runs_strategy so sqlite walks the
+        index in pnl order and stops after n matches.
+        """
+        conn = sqlite3.connect(self.db_path)
+        query = "SELECT * FROM runs"
+        conditions = []
+        params = []
+        if max_drawdown is not None:
+            conditions.append("max_drawdown < ?")
+            params.append(max_drawdown)
+        if strategy:
+            conditions.append("strategy = ?")
+            params.append(strategy)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY pnl DESC LIMIT ?"
+        params.append(n)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+
+    def compare_runs(self, run_ids):
+        """Side by side summary and parameters of the given runs"""
+        runs = self.get_runs(run_ids).set_index("run_id")
+        return runs.join(self.get_run_params(run_ids), how="left")
+
+    def get_run_trades(self, run_id):
+        """Get all trades stored for a run"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query("SELECT * FROM trades WHERE run_id = ? ORDER BY trade_id", conn, params=[run_id])
+        conn.close()
+        return df
     
-    def save_trade(self, trade):
-        """Save a trade from TradeBook"""
+    def save_trade(self, trade, run_id=None, cycle_id=None):
+        """Save a trade from TradeBook, optionally tagged with the run and cycle it belongs to"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
@@ -48,12 +275,13 @@ class TradeDB:
             price = trade['price']
             quantity = trade['qty']
             order = trade['order']
+            charges = trade.get('charges') or 0.0
 
             # Insert trade
             cursor.execute("""
             INSERT INTO trades (
-                symbol, expiry, strike, entry_time, entry_price, quantity, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                symbol, expiry, strike, entry_time, entry_price, quantity, status, run_id, cycle_id, charges
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 symbol,
                 expiry,
@@ -61,7 +289,10 @@ class TradeDB:
                 timestamp,
                 price,
                 quantity,
-                'OPEN' if order == 'S' else 'CLOSED'
+                'OPEN' if order == 'S' else 'CLOSED',
+                run_id,
+                cycle_id,
+                charges
             ))
 
             conn.commit()
@@ -134,3 +365,132 @@ class TradeDB:
         df = pd.read_sql_query(query, conn)
         conn.close()
         return df
+
+    def export_parquet(self, out_dir):
+        """
+        Export trades added since the last export to out_dir into a
+        parquet dataset partitioned as run_id=<id>/month=<YYYY-MM>.
+        Trades saved without a run land in run_id=0.
+        Returns the number of rows exported.
+        """
+        out_key = os.path.abspath(out_dir)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        try:
+            row = cursor.execute("SELECT last_trade_id FROM exports WHERE out_dir = ?", (out_key,)).fetchone()
+            last_trade_id = row[0] if row else 0
+            df = pd.read_sql_query(
+                "SELECT * FROM trades WHERE trade_id > ? ORDER BY trade_id",
+                conn, params=[last_trade_id],
+            )
+            if df.empty:
+                return 0
+
+            # entry_time is written as date + time without a separator, e.g. 2024-01-0109:15:00
+            df["run_id"] = df["run_id"].fillna(0).astype("int64")
+            df["month"] = df["entry_time"].str.slice(0, 7)
+            df["entry_date"] = pd.to_datetime(df["entry_time"].str.slice(0, 10), errors="coerce")
+            df["entry_clock"] = df["entry_time"].str.slice(10)
+
+            first_id, last_id = int(df["trade_id"].iloc[0]), int(df["trade_id"].iloc[-1])
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            ds.write_dataset(
+                table,
+                out_dir,
+                format="parquet",
+                partitioning=["run_id", "month"],
+                partitioning_flavor="hive",
+                basename_template=f"trades-{first_id}-{last_id}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                max_partitions=max(1024, df["run_id"].nunique() * df["month"].nunique()),
+            )
+
+            cursor.execute("""
+            INSERT OR REPLACE INTO exports (out_dir, last_trade_id, exported_at)
+            VALUES (?, ?, ?)
+            """, (out_key, last_id, datetime.now().isoformat(sep=" ", timespec="seconds")))
+            conn.commit()
+            return len(df)
+        except Exception as e:
+            print(f"Error exporting trades: {e}")
+            conn.rollback()
+            return 0
+        finally:
+            conn.close()
+
+    def attach_duckdb(self, con=None, alias="tdb"):
+        """
+        Attach the sqlite file read-only in DuckDB so its tables can be
+        queried columnar as <alias>.trades, <alias>.runs, ...
+        Needs DuckDB's sqlite extension (installed on first use).
+        A connection that already has alias attached is returned as is.
+        """
+        con = con or duckdb.connect()
+        if con.execute("SELECT 1 FROM duckdb_databases() WHERE database_name = ?", [alias]).fetchone():
+            return con
+        con.execute("INSTALL sqlite")
+        con.execute("LOAD sqlite")
+        con.execute(f"ATTACH '{self.db_path}' AS {alias} (TYPE sqlite, READ_ONLY)")
+        return con
+
+    def pnl_rollup(self, by="expiry", run_ids=None, parquet_dir=None, con=None):
+        """
+        PnL per run grouped by expiry, weekday or entry_hour, computed in DuckDB.
+        A cycle is all trades of a run with one cycle_id (trades saved
+        without one fall back to one cycle per expiry); its pnl is the cash
+        flow of those trades net of charges, the same figure summarize_tradebooks
+        stores in runs.pnl, and weekday/entry_hour come from its first fill.
+        Reads the exported parquet dataset if parquet_dir is given, else the
+        attached sqlite file.
+        """
+        keys = {
+            "expiry": "expiry",
+            "weekday": "dayname(entry_date)",
+            "entry_hour": "CAST(substr(entry_clock, 1, 2) AS INTEGER)",
+        }
+        if by not in keys:
+            raise ValueError(f"by must be one of {list(keys)}")
+
+        if parquet_dir:
+            con = con or duckdb.connect()
+            source = f"read_parquet('{os.path.join(parquet_dir, '**', '*.parquet')}', hive_partitioning = true, union_by_name = true)"
+        else:
+            con = self.attach_duckdb(con)
+            source = "tdb.trades"
+
+        columns = set(con.execute(f"DESCRIBE SELECT * FROM {source}").df()["column_name"])
+        cycle = "CAST(cycle_id AS VARCHAR)" if "cycle_id" in columns else "NULL"
+        charges = "coalesce(charges, 0)" if "charges" in columns else "0"
+
+        where = ""
+        if run_ids:
+            where = f"WHERE run_id IN ({','.join(str(int(r)) for r in run_ids)})"
+
+        return con.execute(f"""
+        WITH cycles AS (
+            SELECT
+                CAST(coalesce(run_id, 0) AS BIGINT) AS run_id,
+                coalesce({cycle}, 'expiry ' || CAST(expiry AS VARCHAR)) AS cycle,
+                min(CAST(expiry AS VARCHAR)) AS expiry,
+                min(entry_time) AS first_fill,
+                sum(-quantity * entry_price - {charges}) AS pnl
+            FROM {source}
+            {where}
+            GROUP BY 1, 2
+        ),
+        cycle_keys AS (
+            SELECT *,
+                   CAST(substr(first_fill, 1, 10) AS DATE) AS entry_date,
+                   substr(first_fill, 11) AS entry_clock
+            FROM cycles
+        )
+        SELECT run_id, {keys[by]} AS {by},
+               count(*) AS cycles,
+               sum(pnl) AS pnl,
+               avg(pnl) AS avg_pnl,
+               avg(CASE WHEN pnl > 0 THEN 1.0 ELSE 0.0 END) AS win_rate
+        FROM cycle_keys
+        GROUP BY ALL
+        ORDER BY run_id, {by}
+        """).df()
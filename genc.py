@@ -1,16 +1,45 @@
 import os
+import copy
+import pickle
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Optional
 import logging
 from datetime import date, timedelta
 import datetime
 from tradebook import TradeBook
+from orders import MultiLegOrder, split_symbol
+from precompute import atm_series, minute_views
+from greeks import PortfolioGreeks
+from pricing import greeks_sidecar
+from resample import resampled_path
+from result_cache import strategy_fingerprint
+from compact import compact_frame
+import pyarrow.parquet as pq
 import json
 import duckdb
 import time
 
 
+CHECKPOINT_VERSION = 1
+# engine attributes a checkpoint carries; the cycle's strategy is stored too
+RUN_STATE = ("last_traded_time", "position_exited", "all_tradebooks", "cycles_closed", "tb",
+             "current_expiry", "expiries_to_trade", "greeks_history", "_trace", "_skip_until", "_cached_exit_time")
+# per-day data and engine-wide links a stored strategy drops; reloaded or relinked on resume
+DAY_DATA = {"options_data": None, "atm_series": None, "bar_views": None, "chains": {}, "chain_views": {}, "expiry_cache": {},
+            "strike_bounds": None, "widen": None}
+LINKS = ("mtm_recorder", "greeks_history", "gateway", "latency", "results_sink", "day_store")
+
+
 class GenericStrategy:
+    uses_atm_series = False  # Strategies set this to get per-minute ATM/straddle arrays built at load time
+    track_greeks = False  # Strategies set this to get self.greeks updated every bar with open positions
+    bar_minutes = 1  # Strategies deciding on coarser bars run on cached resampled chains
+    expiry_ranks = ()  # nearest_expiry ranks loaded with the traded expiry on entry days, e.g. (1, 2) for calendars
+    strike_window = None  # Strikes loaded around the day's spot range: an int is strikes either side, a float a moneyness band
+    strike_step = 50  # Strike spacing that turns a strike_window count into points
+
     def __init__(self, data_dir: str, expiry_list_file: str,is_intraday :bool=False):
         self.data_dir = data_dir
         self.current_date = None
@@ -18,7 +47,9 @@ class GenericStrategy:
         self.current_expiry = None
         self.options_data = None  # Cache for option data
         self.tb = TradeBook()  # Initialize tradebook
-        self.expiry_cache = {}  # Cache for expiry dates
+        self.expiry_cache = {}  # (path, expiry) -> that expiry's chain, for the day being run
+        self.chains = {}  # expiry -> chain of every expiry loaded for the current day
+        self.chain_views = {}  # expiry -> {minute: rows}, split on first use
         self.multiple = True
         self.expiry_list_file = expiry_list_file
         self.expiries_to_trade = None
@@ -26,6 +57,30 @@ class GenericStrategy:
         self.is_intraday=is_intraday
         self.is_start_next_trade_next_day=True
         self.expiry_to_expiry=True
+        self.results_sink = None  # Optional ParquetResultsSink, cycles are streamed instead of kept
+        self.mtm_recorder = None  # Optional MTMRecorder for per-minute equity of each cycle
+        self.cycles_closed = 0
+        self.atm_series = None
+        self.greeks = None  # Portfolio delta/gamma/theta/vega at the current bar
+        self.portfolio_greeks = None
+        self.greeks_history = None  # Shared list of greek rows when run(record_greeks=True)
+        self.cost_model = None  # Optional costs.CostModel applied to every fill of every cycle
+        self.compute_greeks = False  # Fill iv/greeks missing from the chain from a cached sidecar
+        self.greeks_cache_dir = None
+        self.bars_cache_dir = None
+        self.bar_views = None  # (day frame, {minute: rows}) split once per load
+        self.day_store = None  # Optional per-day memo shared by engines running side by side
+        self.strategy_params = {}  # Attributes set on every strategy instance this engine creates
+        self.gateway = None  # Optional order gateway (replay.LocalGateway) fills are routed through
+        self.latency = None  # Optional latency.LatencyRecorder timing bars and order decisions
+        self.result_cache = None  # Optional result_cache.ResultCache serving unchanged cycles from disk
+        self.catalog = None  # Optional catalog.DayCatalog answering expiry lookups without scanning the day
+        self.ipc_cache = None  # Optional ipc_cache.ArrowDayCache of decoded expiry frames, memory-mapped on reuse
+        self.float_dtype = None  # e.g. "float32": loaded frames get compact dtypes (compact.compact_frame)
+        self.price_decimals = 2  # fills priced from compact frames are rounded back to this many decimals
+        self.strike_bounds = None  # (lo, hi) strikes of the loaded chain when the strategy has a strike_window
+        self.widen = None  # On strategy instances: reloads the day's chain without the strike window
+        self._chain_source = None
 
        
         logging.basicConfig(
@@ -41,24 +96,194 @@ class GenericStrategy:
         """
         fetches unique expiries for the whole trading day 
         """
-        sort_list=duckdb.query(f"SELECT DISTINCT expiry FROM '{path}'").to_df()['expiry'].tolist()
+        if self.catalog is not None:
+            sort_list = self.catalog.expiries(os.path.basename(path))
+            if sort_list is None:
+                raise FileNotFoundError(path)
+        else:
+            sort_list=self._shared(("expiries", path), lambda: duckdb.query(f"SELECT DISTINCT expiry FROM '{path}'").to_df()['expiry'].tolist())
         self.expiries_to_trade = sorted(sort_list)
         
         
 
-    def get_options_data(self,path,expiry:str):
-        
+    def _shared(self, key, loader):
+        """
+        loader() through the shared day store when engines run side by side
+        """
+        if self.day_store is None:
+            return loader()
+        return self.day_store.get(key, loader)
+
+    def get_options_data(self,path,expiry:str,columns:Optional[List[str]]=None,strikes=None):
+        """
+        load one expiry of a day's chain, optionally only the given columns
+        and only strikes within strikes=(lo, hi)
+        """
         if isinstance(expiry,list):
             expiry=expiry[0]
-        if expiry in self.expiry_cache:
-            self.options_data = self.expiry_cache[expiry]
+        if (path, expiry) in self.expiry_cache:
+            strikes = None
+        key = (path, expiry, tuple(columns) if columns else None, self.compute_greeks, self.float_dtype, strikes)
+        if (path, expiry) in self.expiry_cache:
+            self.options_data = self.expiry_cache[(path, expiry)]
         else:
-            self.options_data = duckdb.query(f"SELECT * FROM '{path}' WHERE expiry = '{expiry}'").to_df()
+            self.options_data = self._shared(("chain",) + key, lambda: self._load_expiry(path, expiry, columns, strikes))
+        self.strike_bounds = strikes
+        self._chain_source = (path, expiry, columns)
+        self.bar_views = (self.options_data, self._shared(("views",) + key, lambda: minute_views(self.options_data)))
+        if self.uses_atm_series:
+            self.atm_series = self._shared(("atm",) + key, lambda: atm_series(self.options_data))
+
+    def load_expiries(self, path, expiries: List[str], columns: Optional[List[str]] = None):
+        """
+        Load several expiries of a day's chain with one scan and keep each in
+        the expiry cache, so positions across expiries cost one read per day.
+        self.chains maps every requested expiry found in the file to its chain.
+        """
+        expiries = list(dict.fromkeys(e for e in expiries if isinstance(e, str)))
+        if columns and "expiry" not in columns:
+            columns = ["expiry"] + list(columns)
+        if any(p != path for p, _ in self.expiry_cache):
+            self.expiry_cache = {}
+        missing = [e for e in expiries if (path, e) not in self.expiry_cache]
+        if missing:
+            key = ("chains", path, tuple(missing), tuple(columns) if columns else None, self.compute_greeks, self.float_dtype)
+            frames = self._shared(key, lambda: self._split_expiries(self._load_options_data(path, missing, columns)))
+            for expiry, frame in frames.items():
+                self.expiry_cache[(path, expiry)] = frame
+        self.chains = {e: self.expiry_cache[(path, e)] for e in expiries if (path, e) in self.expiry_cache}
+        self.chain_views = {}
+        return self.chains
+
+    @staticmethod
+    def _split_expiries(data: pd.DataFrame):
+        return {expiry: rows.reset_index(drop=True) for expiry, rows in data.groupby("expiry", sort=False, observed=True)}
+
+    def chain_bar(self, expiry: str, timestamp: str) -> Optional[pd.DataFrame]:
+        """
+        rows of one loaded expiry at a minute, None if that expiry isn't loaded
+        """
+        if expiry not in self.chains:
+            return None
+        if expiry not in self.chain_views:
+            self.chain_views[expiry] = minute_views(self.chains[expiry])
+        views = self.chain_views[expiry]
+        return views.get(timestamp, self.chains[expiry].iloc[:0])
+
+    def expiries_needed(self) -> List[str]:
+        """
+        expiries this cycle has to see today: its own plus those of open legs
+        traded with an explicit expiry
+        """
+        needed = [self.position_expiry] if getattr(self, "position_expiry", None) else []
+        for symbol in self.tb.open_positions:
+            expiry = split_symbol(symbol)[2]
+            if expiry and expiry not in needed:
+                needed.append(expiry)
+        return needed
+
+    def _load_expiry(self, path, expiry, columns=None, strikes=None):
+        """
+        one expiry's frame, through the Arrow IPC cache when one is attached
+        """
+        if self.ipc_cache is None:
+            return self._load_options_data(path, expiry, columns, strikes)
+        return self.ipc_cache.get(path, expiry, lambda: self._load_options_data(path, expiry, columns, strikes),
+                                  columns=columns, tag=f"greeks={self.compute_greeks},dtype={self.float_dtype},strikes={strikes}")
+
+    def _load_options_data(self, path, expiry, columns=None, strikes=None):
+        expiries = [expiry] if isinstance(expiry, str) else list(expiry)
+        if len(expiries) == 1:
+            where = f"expiry = '{expiries[0]}'"
+        else:
+            where = "expiry IN (" + ", ".join(f"'{e}'" for e in expiries) + ")"
+        if strikes is not None:
+            where += f" AND strike BETWEEN {strikes[0]} AND {strikes[1]}"
+        sidecar = greeks_sidecar(path, self.greeks_cache_dir) if self.compute_greeks else None
+        if columns:
+            available = set(pq.read_schema(path).names)
+            if sidecar:
+                available |= set(pq.read_schema(sidecar).names)
+            columns = [c for c in columns if c in available]
+        select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        if sidecar:
+            df = duckdb.query(
+                f"SELECT {select} FROM (SELECT d.*, g.* EXCLUDE (expiry, minute, strike) FROM '{path}' d "
+                f"JOIN '{sidecar}' g USING (expiry, minute, strike) WHERE d.{where}) "
+                f"ORDER BY expiry, minute, strike"  # a join doesn't keep the file's row order
+            ).to_df()
+        else:
+            df = duckdb.query(f"SELECT {select} FROM '{path}' WHERE {where}").to_df()
+        return compact_frame(df, self.float_dtype) if self.float_dtype else df
+
+    def strike_range(self, path, expiry, strategy_class, held=()):
+        """
+        (lo, hi) strikes to load for strategy_class.strike_window around the
+        day's spot range of expiry, widened to cover held strikes; None to
+        load every strike
+        """
+        window = getattr(strategy_class, "strike_window", None)
+        if not window or not isinstance(expiry, str):
+            return None
+        spot = self._spot_range(path, expiry)
+        if spot is None:
+            return None
+        lo, hi = spot
+        if isinstance(window, float):
+            lo, hi = lo * (1 - window), hi * (1 + window)
+        else:
+            step = getattr(strategy_class, "strike_step", 50)
+            lo, hi = lo - window * step, hi + window * step
+        for strike in held:
+            lo, hi = min(lo, strike), max(hi, strike)
+        return int(np.floor(lo)), int(np.ceil(hi))
+
+    def _spot_range(self, path, expiry):
+        """
+        min and max spot of a day's expiry, from the catalog when one is
+        attached; None if the file has no spot_price
+        """
+        if self.catalog is not None:
+            rows = self.catalog.day(os.path.basename(path))
+            if rows is not None:
+                match = rows[rows["expiry"] == expiry]
+                if len(match) == 1 and pd.notna(match["spot_min"].iloc[0]):
+                    return float(match["spot_min"].iloc[0]), float(match["spot_max"].iloc[0])
+        if "spot_price" not in pq.read_schema(path).names:
+            return None
+        lo, hi = self._shared(("spot", path, expiry), lambda: duckdb.query(
+            f"SELECT min(spot_price), max(spot_price) FROM '{path}' WHERE expiry = '{expiry}'").fetchone())
+        return None if lo is None else (lo, hi)
+
+    def _widen_chain(self):
+        """
+        reload today's chain of the traded expiry without the strike window,
+        after a leg fell outside the loaded band. Returns the frame, its
+        minute views and ATMSeries.
+        """
+        path, expiry, columns = self._chain_source
+        logging.info(f"Widening {path} {expiry} beyond strikes {self.strike_bounds}")
+        self.get_options_data(path, expiry, columns)
+        return self.options_data, self.bar_views, self.atm_series
+
+    def _widen_strikes(self, timestamp: str) -> pd.DataFrame:
+        """
+        switch a strategy to the day's whole chain mid-day; returns the bar
+        at timestamp
+        """
+        self.options_data, self.bar_views, self.atm_series = self.widen()
+        self.strike_bounds = None
+        return self.bar(self.options_data, timestamp)
 
     def get_expiry(self,path,index=1,monthly=False):
         """
         Get particular necessary expiry
         """
+        if self.catalog is not None:
+            return self.catalog.expiry_by_rank(os.path.basename(path), index, monthly)
+        return self._shared(("expiry", path, index, monthly), lambda: self._query_expiry(path, index, monthly))
+
+    def _query_expiry(self, path, index, monthly):
         if monthly:
             return duckdb.query(f"SELECT DISTINCT expiry FROM '{path}' WHERE monthly_expiry_number = {index}").to_df().squeeze() if len(duckdb.query(f"SELECT DISTINCT expiry FROM '{path}' WHERE nearest_expiry = 1").to_df()) == 1 else None
         else:
@@ -68,6 +293,11 @@ class GenericStrategy:
         """
         Enter a new position
         """
+        entry_price = self._fill_prices([entry_price])[0]
+        if self.gateway is not None:
+            self.submit_fills(timestamp=str(self.current_date) + timestamp, symbols=[symbol], prices=[entry_price],
+                              qtys=[quantity], orders=[order], expiry=[expiry], strike=[strike])
+            return
         self.tb.add_trade(
             timestamp=str(self.current_date) + timestamp,
             symbol=symbol,
@@ -79,154 +309,727 @@ class GenericStrategy:
         )
 
 
+    def submit_fills(self, **batch):
+        """
+        add a batch of fills (TradeBook.add_trades arguments) to the
+        tradebook, through the order gateway when one is attached
+        """
+        batch["prices"] = self._fill_prices(batch["prices"])
+        if self.latency is not None:
+            decision = time.perf_counter_ns()
+            source = self.latency.source()
+            out = self.gateway.submit(self.tb, batch) if self.gateway is not None else self.tb.add_trades(**batch)
+            self.latency.order(decision, time.perf_counter_ns(), source)
+            return out
+        if self.gateway is not None:
+            return self.gateway.submit(self.tb, batch)
+        return self.tb.add_trades(**batch)
+
+    def _fill_prices(self, prices):
+        """
+        fill prices as float64 for accounting; prices read from float32
+        frames (float_dtype, or a compacted directory) are rounded back to
+        price_decimals
+        """
+        compact = self.float_dtype and np.dtype(self.float_dtype) != np.float64
+        if not compact:
+            data = self.options_data
+            compact = data is not None and "call_close" in data and data["call_close"].dtype == np.float32
+        if not compact:
+            return prices
+        return np.round(np.asarray(prices, dtype=np.float64), self.price_decimals)
+
+    def _leg_fills(self, order: MultiLegOrder, data: pd.DataFrame, timestamp: str):
+        """
+        close of every leg at this bar, legs with their own expiry priced from
+        that expiry's chain. Returns (prices, market) or None if a leg's strike
+        is missing.
+        """
+        n = len(order)
+        prices = np.empty(n, dtype=np.float64)
+        costed = self.tb.cost_model is not None
+        spot = np.full(n, np.nan)
+        spread = np.full(n, np.nan)
+        has_spread = False
+        for expiry, (idx, sub) in order.by_expiry().items():
+            bar = data if expiry is None else self.chain_bar(expiry, timestamp)
+            rows = sub.resolve_rows(bar) if bar is not None else None
+            if rows is None and expiry is None and self.strike_bounds is not None and self.widen is not None:
+                bar = data = self._widen_strikes(timestamp)
+                rows = sub.resolve_rows(bar)
+            if rows is None:
+                logging.warning(f"Could not price all legs of {order} at {timestamp}")
+                return None
+            prices[idx] = sub.leg_values(bar, rows, "call_close", "put_close")
+            if costed:
+                if "spot_price" in bar:
+                    spot[idx] = bar["spot_price"].to_numpy()[rows]
+                call_spread, put_spread = self.tb.cost_model.spread_columns
+                if call_spread in bar and put_spread in bar:
+                    spread[idx] = sub.leg_values(bar, rows, call_spread, put_spread)
+                    has_spread = True
+        market = None
+        if costed:
+            market = {"spot": None if np.isnan(spot).all() else spot}
+            if has_spread:
+                market["spread"] = spread
+        return prices, market
+
+    def place_legs(self, legs, data: pd.DataFrame, timestamp: str, expiry: str = None):
+        """
+        Fill all legs of a MultiLegOrder (or a list of leg dicts) at the
+        current bar's close with one lookup and add them to the tradebook
+        in one batch. Legs carrying their own expiry are priced from that
+        expiry's loaded chain. Returns the fill prices, or None if a leg's
+        strike is missing from its bar (nothing is traded then).
+        """
+        order = legs if isinstance(legs, MultiLegOrder) else MultiLegOrder(legs)
+        fills = self._leg_fills(order, data, timestamp)
+        if fills is None:
+            return None
+        prices, market = fills
+        expiry = expiry if expiry is not None else self.current_expiry
+        self.submit_fills(
+            timestamp=str(self.current_date) + timestamp,
+            symbols=order.symbols,
+            prices=prices,
+            qtys=order.quantities,
+            orders=order.sides,
+            market=market,
+            expiry=[e or expiry for e in order.expiries],
+            strike=order.strikes,
+        )
+        return prices
+
+    def update_greeks(self, data: pd.DataFrame, timestamp: str):
+        """
+        Recompute self.greeks for the open positions at this bar
+        """
+        if self.portfolio_greeks is None:
+            self.portfolio_greeks = PortfolioGreeks(history=self.greeks_history)
+        bars = {e: self.chain_bar(e, timestamp) for e in self.chains} if len(self.chains) > 1 else None
+        self.greeks = self.portfolio_greeks.compute(
+            self.tb, data, self.current_date, timestamp, getattr(self, "position_expiry", None), bars=bars
+        )
+        return self.greeks
+
+    def record_mtm(self, timestamp: str, mtm: float):
+        """
+        Record the portfolio mtm of the open cycle if an MTMRecorder is attached
+        """
+        if self.mtm_recorder is not None:
+            self.mtm_recorder.record(self.current_date, timestamp, mtm, getattr(self, "spot", None), self.tb.o)
+
+    def bar(self, data: pd.DataFrame, timestamp: str) -> pd.DataFrame:
+        """
+        rows of data at one minute, taken from the per-minute views split at
+        load time when they belong to data
+        """
+        if self.bar_views is not None and self.bar_views[0] is data:
+            return self.bar_views[1].get(timestamp, data.iloc[:0])
+        return data[data["minute"] == timestamp]
+
+    def on_day_start(self, data: Optional[pd.DataFrame] = None):
+        """
+        called before the first bar of a day; data is the day's chain when
+        replaying, None when bars arrive live
+        """
+
+    def on_bar(self, bar: pd.DataFrame, timestamp: str) -> bool:
+        """
+        handle one minute of the chain (every strike of the traded expiry at
+        timestamp). Returns True when the cycle is over. Strategies override
+        it; the engine's own does nothing and never ends the cycle.
+        """
+        return False
+
+    def on_day_end(self):
+        """
+        called after the last bar of a day, or after the bar that ended the cycle
+        """
+
+    def run_strategy(self, current_data: pd.DataFrame, update_time: str = None) -> bool:
+        """
+        Replay a day's chain through on_bar, only after update_time if given
+        Returns: True if strategy has exited position, False if still holding or no position
+        """
+        if self.bar_views is not None and self.bar_views[0] is current_data:
+            views = self.bar_views[1]
+        else:
+            views = minute_views(current_data)
+        self.on_day_start(current_data)
+        latency = self.latency
+        loaded = self.bar_views
+        for timestamp, bar in views.items():
+            if update_time and timestamp <= update_time:
+                continue
+            if self.bar_views is not loaded:
+                # the chain was widened beyond its strike window mid-day
+                bar = self.bar_views[1].get(timestamp, bar)
+            if latency is not None:
+                latency.bar_start()
+            exited = self.on_bar(bar, timestamp)
+            if latency is not None:
+                latency.bar_end()
+            if exited:
+                self.on_day_end()
+                return True
+        self.on_day_end()
+        return False
+
+    def square_off(self, data: pd.DataFrame, timestamp: str):
+        """
+        Close every open leg at this bar's close in one batch
+        """
+        symbols = list(self.tb.open_positions)
+        if not symbols:
+            return
+        legs = MultiLegOrder()
+        for symbol in symbols:
+            strike, option_type, expiry = split_symbol(symbol)
+            qty = self.tb.positions[symbol]
+            legs.add(strike, option_type, "sell" if qty > 0 else "buy", abs(qty), expiry=expiry)
+        fills = self._leg_fills(legs, data, timestamp)
+        if fills is None:
+            logging.warning(f"Could not price all legs to square off at {timestamp}, retracting")
+            self._retract()
+            return
+        cycle_expiry = getattr(self, "position_expiry", None) or self.current_expiry
+        self.submit_fills(
+            timestamp=str(self.current_date) + timestamp,
+            symbols=symbols,
+            prices=fills[0],
+            qtys=legs.quantities,
+            orders=legs.sides,
+            market=fills[1],
+            expiry=[e or cycle_expiry for e in legs.expiries],
+            strike=legs.strikes,
+        )
+
     def _retract(self):
         """
         retract all open positions by removing trades
         """
+        if self.mtm_recorder is not None:
+            self.mtm_recorder.discard_cycle()
         while self.tb.o > 0:
             for symbol in self.tb.open_positions:
                 self.tb.remove_trade(symbol)
 
     
 
+    def _store_tradebook(self, tb: TradeBook):
+        """
+        keep a closed cycle's tradebook, or stream it to the results sink
+        and let it go so memory doesn't grow with the run length
+        """
+        if self.results_sink is not None:
+            self.results_sink.write_cycle(tb)
+        else:
+            self.all_tradebooks.append(tb)
+        if self.mtm_recorder is not None:
+            self.mtm_recorder.end_cycle(self.cycles_closed)
+        self.cycles_closed += 1
+
     def get_path(self):
-        return os.path.join(self.data_dir, f'{self.current_date.strftime("%Y-%m-%d")}.parquet')
+        path = os.path.join(self.data_dir, f'{self.current_date.strftime("%Y-%m-%d")}.parquet')
+        if self.bar_minutes > 1 and os.path.exists(path):
+            return resampled_path(path, self.bar_minutes, self.bars_cache_dir)
+        return path
+
+    def pick_expiry(self, path):
+        """
+        nearest expiry of the day, or the next one on expiry day itself
+        """
+        nearest_expiry = self.get_expiry(path,index=1)
+        if not isinstance(nearest_expiry, str):
+            return None
+        near_d=datetime.date(int(nearest_expiry[:4]),int(nearest_expiry[5:7]),int(nearest_expiry[8:10]))
+        if self.current_date==near_d:
+            nearest_expiry1 = self.get_expiry(path,index=2)
+            return nearest_expiry1 if isinstance(nearest_expiry1, str) else None
+        return nearest_expiry
+
+    def _load_ranked_expiries(self, path, expiry, strategy_class, columns=None):
+        """
+        on an entry day, load the traded expiry together with the strategy's
+        expiry_ranks in one scan
+        """
+        ranks = getattr(strategy_class, "expiry_ranks", ())
+        if not ranks:
+            self.chains, self.chain_views = {}, {}
+            return
+        extra = [self.get_expiry(path, index=r) for r in ranks]
+        self.load_expiries(path, [expiry] + extra, columns)
+
+    def _new_strategy(self, strategy_class):
+        """
+        create a strategy instance for a new cycle wired to this engine's
+        data, recorders and cost model
+        """
+        strategy = strategy_class(self.data_dir, self.expiry_list_file)
+        strategy.current_date = self.current_date
+        strategy.current_expiry = self.current_expiry
+        strategy.options_data = self.options_data
+        strategy.atm_series = self.atm_series
+        strategy.bar_views = self.bar_views
+        strategy.chains = self.chains
+        strategy.chain_views = self.chain_views
+        strategy.exp_to_trade = self.expiries_to_trade 
+        strategy.mtm_recorder = self.mtm_recorder
+        strategy.greeks_history = self.greeks_history
+        strategy.cost_model = self.cost_model
+        strategy.gateway = self.gateway
+        strategy.latency = self.latency
+        strategy.float_dtype = self.float_dtype
+        strategy.price_decimals = self.price_decimals
+        strategy.strike_bounds = self.strike_bounds
+        strategy.widen = self._widen_chain
+        strategy.tb.cost_model = self.cost_model
+        for k, v in self.strategy_params.items():
+            setattr(strategy, k, v)
+        return strategy
+
+    def run_day(self, day: date, strategy_class) -> Optional[TradeBook]:
+        """
+        One intraday cycle: load the day's expiry with the strategy's column
+        projection, run it and square off anything still open at the last
+        bar. Returns the day's tradebook, None if nothing was traded.
+        """
+        self.current_date = day
+        self.uses_atm_series = getattr(strategy_class, "uses_atm_series", False)
+        self.bar_minutes = getattr(strategy_class, "bar_minutes", 1)
+        path = self.get_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            self.get_all_expiries(path)
+            self.current_expiry = self.pick_expiry(path)
+            if not self.current_expiry:
+                return None
+            columns = getattr(strategy_class, "columns", None)
+            self._load_ranked_expiries(path, self.current_expiry, strategy_class, columns)
+            self.get_options_data(path, self.current_expiry, columns=columns,
+                                  strikes=self.strike_range(path, self.current_expiry, strategy_class))
+        except duckdb.Error as e:
+            logging.warning(f"No data found for date {day}: {e}")
+            return None
+        if self.options_data.empty:
+            return None
+
+        strategy = self._new_strategy(strategy_class)
+        strategy.run_strategy(self.options_data)
+        if strategy.tb.open_positions:
+            last_minute = self.options_data["minute"].max()
+            strategy.current_time = last_minute
+            strategy.square_off(strategy.bar(self.options_data, last_minute), last_minute)
+        if not strategy.tb.all_trades:
+            return None
+        return strategy.tb
+
+    def run_intraday(self, start_date: date, end_date: date, strategy_class, workers: int = 1):
+        """
+        Every day is an independent flat-to-flat cycle. With workers > 1 the
+        days run in a process pool; results are stored in date order.
+        Recorders (mtm, greeks) are only filled when workers == 1, and an
+        order gateway or latency recorder can't be used with workers > 1.
+        """
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        days = [d for d in days if d.weekday() < 5]
+        if workers <= 1:
+            for day in days:
+                tb = self.run_day(day, strategy_class)
+                if tb is not None:
+                    self._store_tradebook(tb)
+                elif self.mtm_recorder is not None:
+                    self.mtm_recorder.discard_cycle()
+        else:
+            attached = [k for k in ("gateway", "latency") if getattr(self, k) is not None]
+            if attached:
+                raise ValueError(f"{', '.join(attached)} can't be sent to worker processes, run with workers=1")
+            settings = {
+                "strategy_params": self.strategy_params,
+                "cost_model": self.cost_model,
+                "compute_greeks": self.compute_greeks,
+                "greeks_cache_dir": self.greeks_cache_dir,
+                "bars_cache_dir": self.bars_cache_dir,
+                "ipc_cache": self.ipc_cache,
+                "float_dtype": self.float_dtype,
+                "price_decimals": self.price_decimals,
+                "catalog": self.catalog,
+            }
+            args = [(self.data_dir, self.expiry_list_file, strategy_class, day, settings) for day in days]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for tb in pool.map(_run_intraday_day, args, chunksize=max(1, len(days) // (workers * 4))):
+                    if tb is not None:
+                        self._store_tradebook(tb)
+
+        if self.results_sink is not None:
+            self.results_sink.close()
+        if self.mtm_recorder is not None:
+            self.mtm_recorder.save()
         
 
     
 
-    def run(self, start_date: date, end_date: date, strategy_class):
+    def run(self, start_date: date, end_date: date, strategy_class, results_sink=None, mtm_recorder=None, record_greeks=False, cost_model=None, workers=1,
+            checkpoint_path=None, checkpoint_every=None, resume_from=None, result_cache=None):
         """
         Run the strategy between start_date and end_date
         Args:
             start_date: Starting date
             end_date: Ending date
             strategy_class: Strategy class to use
+            results_sink: Optional ParquetResultsSink; closed cycles are written
+                to it instead of being collected in all_tradebooks
+            mtm_recorder: Optional MTMRecorder; strategies record their
+                per-minute mtm into it, saved at the end of the run
+            record_greeks: Keep every bar's portfolio greeks in greeks_history
+                (strategies with track_greeks only)
+            cost_model: Optional CostModel for slippage and charges on every fill
+            workers: Processes to spread days over when is_intraday
+            checkpoint_path, checkpoint_every, resume_from, result_cache:
+                positional runs only; passing any of them with is_intraday
+                raises ValueError
+            checkpoint_path: Write a checkpoint here after every closed cycle
+                (with a results_sink, whenever it has written a row group),
+                every checkpoint_every days if given, and at the end date.
+                The sink's cycles then span part files; read them with
+                results_sink.read_results
+            resume_from: Checkpoint to continue from; days before its cursor
+                are skipped, so a later end_date only computes the new days
+            result_cache: Optional ResultCache; cycles whose strategy, start
+                and day files are unchanged are served from it instead of run
+                (not used with an mtm_recorder or record_greeks)
         """
+        if self.is_intraday:
+            positional = {"checkpoint_path": checkpoint_path, "checkpoint_every": checkpoint_every,
+                          "resume_from": resume_from, "result_cache": result_cache}
+            given = [k for k, v in positional.items() if v is not None]
+            if given:
+                raise ValueError(f"{', '.join(given)} can't be used with is_intraday (positional runs only)")
+        self._start_run(strategy_class, results_sink, mtm_recorder, record_greeks, cost_model)
+        self._end_date = end_date
+        if result_cache is not None:
+            self.result_cache = result_cache
+            self._fingerprint = strategy_fingerprint(
+                strategy_class, self.strategy_params, cost_model=self.cost_model,
+                bar_minutes=self.bar_minutes, compute_greeks=self.compute_greeks,
+                float_dtype=self.float_dtype, price_decimals=self.price_decimals,
+            )
+        if self.is_intraday:
+            return self.run_intraday(start_date, end_date, strategy_class, workers=workers)
         current_date = start_date
-        strategy = None
-        last_traded_time=None
-        update_time=None
-        path=None
+        if resume_from is not None:
+            current_date = max(start_date, self.resume(resume_from))
+        last_checkpoint = (current_date, self.cycles_closed)
         while current_date <= end_date:
-            self.current_date = current_date
-            print(self.current_date)
-            # If we have an active strategy instance 
-            if strategy and strategy.position_expiry and strategy.tb.positions:
-                try:
-                    strategy.last_trade_updated_time=None
-                    logging.info(f"Strategy date path {path} ")
-                    path=self.get_path()
-                    self.get_options_data(path,strategy.position_expiry)
-                    strategy.current_date = self.current_date
-                    strategy.options_data = self.options_data  # Update with today's data
-                    print(self.current_date,self.current_expiry,"derrrr")
-                    
-                    # Run strategy with current day's data
-                    position_exited = strategy.run_strategy(self.options_data)
-
-                    # If position was exited today or no positions in tradebook
-                    if position_exited:
-                        
-                        last_traded_time=strategy.current_time
-                        logging.info(f"Strategy exited position for expiry {strategy.position_expiry} @ {strategy.current_time}")
-                        if strategy.tb.all_trades:  # Only append if there are trades
-                            self.all_tradebooks.append(strategy.tb)
-                            self.tb = TradeBook()
-                            self.current_expiry = None
-                        strategy = None
-                        #current_date -= timedelta(days=1)
-                   
-                except (FileNotFoundError, duckdb.IOException) as e:
-                    logging.warning(f"No data found for date {current_date} and expiry {strategy.position_expiry}")
-                    if strategy:
-                        if strategy.position_expiry==self.current_date:
-                            if not(position_exited):
-                                logging.info(f"there is no data on expiry {strategy.position_expiry}")
-                                print(position_exited,self.current_date)
-                                self._retract()
-                                strategy=None
-                                last_traded_time=None
-          
-            # If we don't have an active strategy or no open positions, look for new entry
-            if strategy==None:
-                if last_traded_time:
-                    update_time=last_traded_time
-                    last_traded_time=None
-                    logging.info(f"strat only after {update_time}")
-                else:
-                    update_time=None
+            self.step_day(current_date)
+            current_date += timedelta(days=1)
+            # with a results sink, closed cycles are only checkpointed once it has written them out as a
+            # row group, so each part file holds cycles_per_row_group cycles rather than one
+            closed = self.cycles_closed != last_checkpoint[1] and (self.results_sink is None or not self.results_sink.pending)
+            if checkpoint_path and (closed or
+                                    (checkpoint_every and (current_date - last_checkpoint[0]).days >= checkpoint_every)):
+                self.checkpoint(checkpoint_path, current_date)
+                last_checkpoint = (current_date, self.cycles_closed)
+        if checkpoint_path:
+            # before _finish_run drops the open cycle, so the run can be extended
+            self.checkpoint(checkpoint_path, current_date)
+        self._finish_run()
 
-                path=self.get_path()
-                logging.info(f"Strategy date path1 {path}")
-                
-                
-                try:
-                    self.get_all_expiries(path) 
-                except:
-                    current_date += timedelta(days=1)
-                    continue
-                
-                
-                print(self.expiries_to_trade,self.current_date)
-                if not self.expiries_to_trade:
-                    current_date += timedelta(days=1)
-                    continue
-                nearest_expiry = self.get_expiry(path,index=1)
-                print(self.current_date,nearest_expiry,"expiry  gng to trade")
-                print(type(self.current_date),type(nearest_expiry))
+    def checkpoint(self, path: str, cursor: date):
+        """
+        Write the positional run state (open cycle, stored tradebooks,
+        counters) with cursor, the next day to run, atomically to path.
+        The day's chain data is left out and reloaded on resume; a results
+        sink finalizes its current part file so every closed cycle survives
+        a crash. MTM recorder marks are not checkpointed.
+        """
+        strategy = None
+        if self.strategy is not None:
+            strategy = copy.copy(self.strategy)
+            for k in LINKS:
+                setattr(strategy, k, None)
+            for k, v in DAY_DATA.items():
+                setattr(strategy, k, copy.copy(v))
+            strategy.portfolio_greeks = None
+        state = {k: getattr(self, k) for k in RUN_STATE}
+        state.update({
+            "version": CHECKPOINT_VERSION,
+            "strategy_class": f"{self.strategy_class.__module__}.{self.strategy_class.__qualname__}",
+            "cursor": cursor,
+            "strategy": strategy,
+            "sink_part": self.results_sink.checkpoint() if self.results_sink is not None else 0,
+        })
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        logging.info(f"Checkpoint at {cursor} ({self.cycles_closed} cycles) written to {path}")
 
-                
-                near_d=datetime.date(int(nearest_expiry[:4]),int(nearest_expiry[5:7]),int(nearest_expiry[8:]))
-                if self.current_date==near_d:
-                    nearest_expiry1 = self.get_expiry(path,index=2)
-                    logging.info(f"yes baby{nearest_expiry} {nearest_expiry1}nearest_expiry")
-                    self.current_expiry = nearest_expiry1
+    def resume(self, path: str) -> date:
+        """
+        Restore the run state of a checkpoint written by the same strategy
+        class and return its cursor
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+        name = f"{self.strategy_class.__module__}.{self.strategy_class.__qualname__}"
+        if state["strategy_class"] != name:
+            raise ValueError(f"checkpoint {path} was written by {state['strategy_class']}, not {name}")
+        for k in RUN_STATE:
+            if k == "greeks_history" and self.greeks_history is None:
+                continue
+            setattr(self, k, state.get(k, getattr(self, k)))
+        strategy = state["strategy"]
+        if strategy is not None:
+            for k in LINKS:
+                setattr(strategy, k, getattr(self, k))
+            strategy.tb.cost_model = self.cost_model
+        self.strategy = strategy
+        if self.results_sink is not None:
+            # cycle ids and part files continue where the checkpointed run stopped
+            self.results_sink.cycles_written = max(self.results_sink.cycles_written, self.cycles_closed)
+            self.results_sink.resume(state.get("sink_part", 0))
+        logging.info(f"Resuming from {path} at {state['cursor']} with {self.cycles_closed} cycles")
+        return state["cursor"]
+
+    def _start_run(self, strategy_class, results_sink=None, mtm_recorder=None, record_greeks=False, cost_model=None):
+        """
+        attach the run's sinks and recorders and reset the positional state
+        """
+        if results_sink is not None:
+            self.results_sink = results_sink
+        if mtm_recorder is not None:
+            self.mtm_recorder = mtm_recorder
+        if cost_model is not None:
+            self.cost_model = cost_model
+        self.uses_atm_series = getattr(strategy_class, "uses_atm_series", False)
+        self.bar_minutes = getattr(strategy_class, "bar_minutes", 1)
+        if record_greeks:
+            self.greeks_history = []
+        self.strategy_class = strategy_class
+        self.strategy = None
+        self.last_traded_time = None
+        self.position_exited = False
+        self._path = None
+        self._trace = None  # cycle being recorded for the result cache
+        self._skip_until = None  # exit day of a cycle served from the cache
+        self._cached_exit_time = None
+
+    def step_day(self, current_date: date):
+        """
+        One day of the positional run: carry the open cycle through the day,
+        then look for a new entry if no cycle is active
+        """
+        self.current_date = current_date
+        print(self.current_date)
+        if self._skip_until is not None:
+            if current_date < self._skip_until:
+                return
+            # the cached cycle exited today, look for the next entry after its exit
+            self.last_traded_time = self._cached_exit_time
+            self.position_exited = True
+            self._skip_until = self._cached_exit_time = None
+        strategy = self.strategy
+        # If we have an active strategy instance 
+        if strategy and strategy.position_expiry and strategy.tb.positions:
+            if self._trace is not None:
+                self._trace["days"].append((current_date, self._day_fingerprint(current_date)))
+            try:
+                strategy.last_trade_updated_time=None
+                logging.info(f"Strategy date path {self._path} ")
+                self._path=self.get_path()
+                needed = strategy.expiries_needed()
+                if len(needed) > 1:
+                    self.load_expiries(self._path, needed)
                 else:
-                    self.current_expiry=nearest_expiry
+                    self.chains, self.chain_views = {}, {}
+                held = [k for k, _, e in map(split_symbol, strategy.tb.open_positions) if e in (None, strategy.position_expiry)]
+                self.get_options_data(self._path, strategy.position_expiry,
+                                      strikes=self.strike_range(self._path, strategy.position_expiry, self.strategy_class, held))
+                strategy.current_date = self.current_date
+                strategy.options_data = self.options_data  # Update with today's data
+                strategy.atm_series = self.atm_series
+                strategy.bar_views = self.bar_views
+                strategy.chains = self.chains
+                strategy.chain_views = self.chain_views
+                strategy.strike_bounds = self.strike_bounds
+                strategy.widen = self._widen_chain
+                print(self.current_date,self.current_expiry,"derrrr")
                 
-                if self.current_expiry:
-                    try:
-                        self.get_options_data(path,nearest_expiry)
-                    except  Exception as e :
-                        logging.warning(f"No data found for date {current_date} and expiry {nearest_expiry}")
-                        current_date += timedelta(days=1)
-                        continue
-                    # Create new strategy instance
-                    strategy = strategy_class(self.data_dir, self.expiry_list_file)
-                    strategy.current_date = self.current_date
-                    strategy.current_expiry = self.current_expiry
-                    strategy.options_data = self.options_data
-                    strategy.exp_to_trade = self.expiries_to_trade 
-                    # Run strategy to look for entry
-                    position_exited = strategy.run_strategy(self.options_data,update_time=update_time)
-                    update_time=None
+                # Run strategy with current day's data
+                self.position_exited = strategy.run_strategy(self.options_data)
+
+                # If position was exited today or no positions in tradebook
+                if self.position_exited:
                     
-                    # If position was entered and exited on the same day
-                    if position_exited:
-                        if strategy.tb.all_trades:  # Only append if there are trades
-                            self.all_tradebooks.append(strategy.tb)
-                            self.tb = TradeBook()
-                            self.current_expiry = None
-                        strategy = None
-        #              
-                        # Reset for next entry
+                    self.last_traded_time=strategy.current_time
+                    logging.info(f"Strategy exited position for expiry {strategy.position_expiry} @ {strategy.current_time}")
+                    self._close_trace(strategy.tb, self.last_traded_time)
+                    if strategy.tb.all_trades:  # Only append if there are trades
+                        self._store_tradebook(strategy.tb)
+                        self.tb = TradeBook()
+                        self.current_expiry = None
+                    strategy = self.strategy = None
                
+            except (FileNotFoundError, duckdb.IOException) as e:
+                logging.warning(f"No data found for date {current_date} and expiry {strategy.position_expiry}")
+                if strategy:
+                    if strategy.position_expiry==self.current_date:
+                        if not(self.position_exited):
+                            logging.info(f"there is no data on expiry {strategy.position_expiry}")
+                            print(self.position_exited,self.current_date)
+                            self._retract()
+                            strategy = self.strategy = None
+                            self.last_traded_time=None
+                            self._trace = None
+      
+        # If we don't have an active strategy or no open positions, look for new entry
+        if strategy==None:
+            if self.last_traded_time:
+                update_time=self.last_traded_time
+                self.last_traded_time=None
+                logging.info(f"strat only after {update_time}")
+            else:
+                update_time=None
 
+            if self._cached_cycle(update_time):
+                return
 
+            self._path=path=self.get_path()
+            logging.info(f"Strategy date path1 {path}")
+            
+            
+            try:
+                self.get_all_expiries(path) 
+            except:
+                return
+            
+            
+            print(self.expiries_to_trade,self.current_date)
+            if not self.expiries_to_trade:
+                return
+            nearest_expiry = self.get_expiry(path,index=1)
+            print(self.current_date,nearest_expiry,"expiry  gng to trade")
+            print(type(self.current_date),type(nearest_expiry))
 
+            
+            near_d=datetime.date(int(nearest_expiry[:4]),int(nearest_expiry[5:7]),int(nearest_expiry[8:]))
+            if self.current_date==near_d:
+                nearest_expiry1 = self.get_expiry(path,index=2)
+                logging.info(f"yes baby{nearest_expiry} {nearest_expiry1}nearest_expiry")
+                self.current_expiry = nearest_expiry1
+            else:
+                self.current_expiry=nearest_expiry
+            
+            if self.current_expiry:
+                try:
+                    self._load_ranked_expiries(path, nearest_expiry, self.strategy_class)
+                    self.get_options_data(path, nearest_expiry,
+                                          strikes=self.strike_range(path, nearest_expiry, self.strategy_class))
+                except  Exception as e :
+                    logging.warning(f"No data found for date {current_date} and expiry {nearest_expiry}")
+                    return
+                # Create new strategy instance
+                strategy = self.strategy = self._new_strategy(self.strategy_class)
+                if self._cache_active():
+                    self._trace = {"key": self._cycle_key(update_time), "days": [(current_date, self._day_fingerprint(current_date))]}
+                # Run strategy to look for entry
+                self.position_exited = strategy.run_strategy(self.options_data,update_time=update_time)
+                update_time=None
+                
+                # If position was entered and exited on the same day
+                if self.position_exited:
+                    self._close_trace(strategy.tb, None)
+                    if strategy.tb.all_trades:  # Only append if there are trades
+                        self._store_tradebook(strategy.tb)
+                        self.tb = TradeBook()
+                        self.current_expiry = None
+                    strategy = self.strategy = None
+    #              
+                    # Reset for next entry
 
-            print(current_date ,"before")
-            current_date += timedelta(days=1)
-            print(current_date ,"after")
+        print(current_date ,"before")
+        print(current_date + timedelta(days=1) ,"after")
+
+    def _cache_active(self) -> bool:
+        return self.result_cache is not None and self.mtm_recorder is None and self.greeks_history is None
+
+    def _cycle_key(self, update_time) -> str:
+        return self.result_cache.key(self._fingerprint, str(self.current_date), update_time)
+
+    def _day_fingerprint(self, day: date):
+        return self.result_cache.day_fingerprint(os.path.join(self.data_dir, f'{day.strftime("%Y-%m-%d")}.parquet'))
+
+    def _cached_cycle(self, update_time) -> bool:
+        """
+        Serve the cycle starting now from the result cache if its day files
+        are unchanged and it closes within this run. Its tradebook is stored
+        and the days up to its exit are skipped.
+        """
+        if not self._cache_active():
+            return False
+        entry = self.result_cache.get(self._cycle_key(update_time))
+        if entry is None or entry["exit_day"] > self._end_date:
+            return False
+        if any(self._day_fingerprint(day) != fp for day, fp in entry["days"]):
+            return False
+        logging.info(f"Cycle from {self.current_date} {update_time} served from the result cache, exits {entry['exit_day']}")
+        if entry["tb"].all_trades:
+            self._store_tradebook(entry["tb"])
+            self.tb = TradeBook()
+            self.current_expiry = None
+        self.position_exited = True
+        if entry["exit_day"] != self.current_date:
+            self._skip_until = entry["exit_day"]
+            self._cached_exit_time = entry["last_traded_time"]
+        return True
 
+    def _close_trace(self, tb: TradeBook, last_traded_time):
+        """
+        store the cycle just closed in the result cache
+        """
+        trace, self._trace = self._trace, None
+        if trace is None or not self._cache_active():
+            return
+        self.result_cache.put(trace["key"], {
+            "days": trace["days"],
+            "exit_day": self.current_date,
+            "last_traded_time": last_traded_time,
+            "tb": tb,
+        })
 
+    def _finish_run(self):
+        """
+        drop a cycle still open at the end date and close the sinks
+        """
+        strategy = self.strategy
         if strategy:
             if strategy and strategy.position_expiry and strategy.tb.positions:
-                if not(position_exited):
+                if not(self.position_exited):
                     logging.info(f"end date has been hit no more strategy running after this and there were some open positions {strategy.position_expiry}")
-                    print(position_exited,self.current_date)
+                    print(self.position_exited,self.current_date)
                     self._retract()
-                    strategy=None
-                    last_traded_time=None
-        
+                    self.strategy=None
+                    self.last_traded_time=None
+
+        if self.results_sink is not None:
+            self.results_sink.close()
+        if self.mtm_recorder is not None:
+            self.mtm_recorder.save()
+
+
+
+def _run_intraday_day(args):
+    """
+    process pool entry point: run one intraday day in a fresh engine
+    """
+    data_dir, expiry_list_file, strategy_class, day, settings = args
+    engine = GenericStrategy(data_dir, expiry_list_file, is_intraday=True)
+    for k, v in settings.items():
+        setattr(engine, k, v)
+    return engine.run_day(day, strategy_class)
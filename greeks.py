@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from orders import split_symbol
+
+GREEKS = ("delta", "gamma", "theta", "vega")
+
+
+class PortfolioGreeks:
+    """
+    Portfolio delta/gamma/theta/vega of a TradeBook against one bar of the
+    chain, as a dot product of the position vector with the per-strike
+    greek columns. The position vector is only rebuilt when trades were added.
+    """
+
+    def __init__(self, history: Optional[List] = None):
+        self.history = history  # rows of (date, minute, expiry, delta, gamma, theta, vega) if recording
+        self._version = None
+        self._strikes = np.empty(0, dtype=np.int64)
+        self._is_call = np.empty(0, dtype=bool)
+        self._qty = np.empty(0, dtype=np.float64)
+        self._groups = {}
+
+    def _position_vector(self, tb) -> None:
+        version = (id(tb), len(tb.all_trades))
+        if version == self._version:
+            return
+        self._version = version
+        open_positions = tb.open_positions
+        strikes, is_call, qty, expiries = [], [], [], []
+        for symbol, q in open_positions.items():
+            strike, option_type, expiry = split_symbol(symbol)
+            strikes.append(strike)
+            is_call.append(option_type == "CE")
+            qty.append(q)
+            expiries.append(expiry)
+        self._strikes = np.asarray(strikes, dtype=np.int64)
+        self._is_call = np.asarray(is_call, dtype=bool)
+        self._qty = np.asarray(qty, dtype=np.float64)
+        self._groups = {}
+        for i, expiry in enumerate(expiries):
+            self._groups.setdefault(expiry, []).append(i)
+
+    def _dot(self, idx, data: pd.DataFrame, greeks: Dict[str, float]) -> None:
+        strikes, is_call, qty = self._strikes[idx], self._is_call[idx], self._qty[idx]
+        bar_strikes = data["strike"].to_numpy()
+        order = np.argsort(bar_strikes, kind="stable")
+        sorted_strikes = bar_strikes[order]
+        pos = np.searchsorted(sorted_strikes, strikes)
+        pos[pos == len(sorted_strikes)] = 0
+        found = (sorted_strikes[pos] == strikes) if len(sorted_strikes) else np.zeros(len(pos), bool)
+        rows = order[pos]
+        qty = np.where(found, qty, 0.0)
+        for g in GREEKS:
+            call = data[f"call_{g}"].to_numpy(np.float64)[rows] if f"call_{g}" in data else 0.0
+            put = data[f"put_{g}"].to_numpy(np.float64)[rows] if f"put_{g}" in data else 0.0
+            greeks[g] += float(np.dot(qty, np.nan_to_num(np.where(is_call, call, put))))
+
+    def compute(self, tb, data: pd.DataFrame, current_date=None, timestamp: str = None, expiry=None,
+                bars: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, float]:
+        """
+        greeks of the open positions at this bar, legs whose strike is not
+        in the bar count as zero. Legs traded with their own expiry are
+        looked up in bars[expiry] (zero if that expiry's bar isn't given).
+        """
+        self._position_vector(tb)
+        greeks = dict.fromkeys(GREEKS, 0.0)
+        for leg_expiry, idx in self._groups.items():
+            bar = data if leg_expiry is None else (bars or {}).get(leg_expiry)
+            if bar is not None:
+                self._dot(np.asarray(idx), bar, greeks)
+
+        if self.history is not None:
+            self.history.append((current_date, timestamp, expiry, greeks["delta"], greeks["gamma"], greeks["theta"], greeks["vega"]))
+        return greeks
+
+
+def greeks_frame(history: List) -> pd.DataFrame:
+    """
+    recorded portfolio greeks as a DataFrame
+    """
+    return pd.DataFrame(history, columns=["date", "minute", "expiry"] + list(GREEKS))
@@ -0,0 +1,60 @@
+import os
+import hashlib
+import tempfile
+import logging
+import pandas as pd
+import pyarrow as pa
+from typing import Callable
+
+
+class ArrowDayCache:
+    """
+    On-disk cache of decoded (day, expiry, projection) frames as
+    uncompressed Arrow IPC files. Later reads memory-map the file, so
+    numeric columns become NumPy views of the OS page cache instead of
+    being decompressed again, and worker processes reading the same days
+    share those pages. Entries are keyed by the source file's size and
+    mtime, so a rewritten day is decoded again.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, path: str, expiry: str, columns=None, tag: str = "") -> str:
+        st = os.stat(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        parts = repr((os.path.abspath(path), sorted(columns) if columns else None, tag)).encode()
+        digest = hashlib.sha1(parts).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{stem}.{str(expiry)[:10]}.{digest}.{st.st_size:x}-{st.st_mtime_ns:x}.arrow")
+
+    def get(self, path: str, expiry: str, loader: Callable[[], pd.DataFrame], columns=None, tag: str = "") -> pd.DataFrame:
+        """
+        the frame of one expiry of a day file, memory-mapped from the cache
+        or built with loader() and written to it
+        """
+        cached = self._path(path, expiry, columns, tag)
+        if os.path.exists(cached):
+            self.hits += 1
+            with pa.memory_map(cached, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            return table.to_pandas(split_blocks=True)
+
+        self.misses += 1
+        df = loader()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # a temp name of our own: workers decoding the same day don't write into each other's file
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, cached)  # other workers never map a half-written file
+        except BaseException:
+            os.remove(tmp)
+            raise
+        logging.info(f"Cached {path} {expiry} as {cached}")
+        return df
@@ -0,0 +1,174 @@
+import sys
+import json
+import time
+import logging
+import numpy as np
+from typing import Dict, Optional
+
+SOURCES = ("entry", "enter_more", "exit1", "adjust", "square_off", "exit")
+
+
+class LatencyHistogram:
+    """
+    Fixed-memory log-linear histogram of nanosecond values, HDR style:
+    values below 2**sub_bits are exact, larger ones land in buckets at most
+    1 / 2**(sub_bits - 1) wide relative to the value (under 1.6% for the
+    default). Values above max_ns are clamped into the last bucket.
+    """
+
+    def __init__(self, sub_bits: int = 7, max_ns: int = 60 * 10**9):
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half = self.sub_count >> 1
+        self.max_ns = max_ns
+        self.counts = np.zeros(self._index(max_ns) + 1, dtype=np.int64)
+        self.total = 0
+        self.sum_ns = 0
+        self.min_ns = None
+        self.max_seen = 0
+
+    def _index(self, v: int) -> int:
+        if v < self.sub_count:
+            return v
+        e = v.bit_length() - self.sub_bits
+        return self.sub_count + (e - 1) * self.half + ((v >> e) - self.half)
+
+    def _value(self, i: int) -> int:
+        """
+        midpoint of bucket i
+        """
+        if i < self.sub_count:
+            return i
+        e = (i - self.sub_count) // self.half + 1
+        m = (i - self.sub_count) % self.half + self.half
+        return (m << e) + (1 << (e - 1))
+
+    def record(self, ns: int):
+        ns = min(max(int(ns), 0), self.max_ns)
+        self.counts[self._index(ns)] += 1
+        self.total += 1
+        self.sum_ns += ns
+        self.min_ns = ns if self.min_ns is None else min(self.min_ns, ns)
+        self.max_seen = max(self.max_seen, ns)
+
+    def percentile(self, p: float) -> int:
+        """
+        value at percentile p (0-100), within the bucket precision
+        """
+        if not self.total:
+            return 0
+        rank = max(1, int(np.ceil(p / 100.0 * self.total)))
+        i = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(max(self._value(i), self.min_ns), self.max_seen)
+
+    def merge(self, other: "LatencyHistogram"):
+        self.counts += other.counts
+        self.total += other.total
+        self.sum_ns += other.sum_ns
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_seen = max(self.max_seen, other.max_seen)
+
+    def reset(self):
+        self.counts[:] = 0
+        self.total = self.sum_ns = self.max_seen = 0
+        self.min_ns = None
+
+    def summary(self) -> Dict:
+        """
+        count, mean, min, p50, p90, p99, p99.9 and max in microseconds
+        """
+        us = lambda ns: round(ns / 1e3, 3)
+        return {
+            "count": self.total,
+            "mean_us": us(self.sum_ns / self.total) if self.total else 0.0,
+            "min_us": us(self.min_ns or 0),
+            "p50_us": us(self.percentile(50)),
+            "p90_us": us(self.percentile(90)),
+            "p99_us": us(self.percentile(99)),
+            "p999_us": us(self.percentile(99.9)),
+            "max_us": us(self.max_seen),
+        }
+
+
+class LatencyRecorder:
+    """
+    Per-bar decision latency with time.perf_counter_ns timestamps taken at
+    bar ingest, strategy start, order decision and TradeBook append:
+
+        queue       ingest -> strategy start (time the bar waited)
+        bar         strategy start -> on_bar returned, every bar
+        decision    strategy start -> order emitted, per source method
+                    (entry, enter_more, adjust, exit1, square_off)
+        book        order emitted -> fills appended to the TradeBook
+        end_to_end  ingest -> fills appended
+
+    Attach one to an engine (engine.latency) or a replay.LiveRunner; with
+    none attached the only cost is an attribute check per bar and order.
+    Every log_every bars a snapshot of p50/p99 goes to the log.
+    """
+
+    def __init__(self, log_every: int = 10000):
+        self.log_every = log_every
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.ingest_ns = 0
+        self.start_ns = 0
+        self.bars = 0
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        h = self.histograms.get(name)
+        if h is None:
+            h = self.histograms[name] = LatencyHistogram()
+        return h
+
+    def bar_start(self, ingest_ns: Optional[int] = None):
+        self.start_ns = time.perf_counter_ns()
+        self.ingest_ns = ingest_ns if ingest_ns is not None else self.start_ns
+        if ingest_ns is not None:
+            self.histogram("queue").record(self.start_ns - ingest_ns)
+
+    def bar_end(self):
+        self.histogram("bar").record(time.perf_counter_ns() - self.start_ns)
+        self.bars += 1
+        if self.log_every and self.bars % self.log_every == 0:
+            self.log()
+
+    def order(self, decision_ns: int, booked_ns: int, source: str = "other"):
+        self.histogram(f"decision.{source}").record(decision_ns - self.start_ns)
+        self.histogram("book").record(booked_ns - decision_ns)
+        self.histogram("end_to_end").record(booked_ns - self.ingest_ns)
+
+    @staticmethod
+    def source(depth: int = 8) -> str:
+        """
+        name of the nearest strategy method up the stack that emitted the order
+        """
+        frame = sys._getframe(2)
+        while frame is not None and depth:
+            if frame.f_code.co_name in SOURCES:
+                return frame.f_code.co_name
+            frame = frame.f_back
+            depth -= 1
+        return "other"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def log(self):
+        for name, s in self.snapshot().items():
+            logging.info(f"latency {name}: n={s['count']} p50={s['p50_us']}us p99={s['p99_us']}us max={s['max_us']}us")
+
+    def dump(self, path: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        current summaries, also written as JSON to path if given
+        """
+        snap = self.snapshot()
+        if path:
+            with open(path, "w") as f:
+                json.dump(snap, f, indent=2)
+        return snap
+
+    def reset(self):
+        for h in self.histograms.values():
+            h.reset()
+        self.bars = 0
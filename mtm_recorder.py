@@ -0,0 +1,142 @@
+import logging
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Optional
+
+
+class MTMRecorder:
+    """
+    Records per-minute portfolio MTM, spot and open leg count of the
+    running cycle into preallocated float32/int arrays.
+    Rows of the open cycle are pending until the engine closes the cycle
+    (end_cycle) or throws it away (discard_cycle).
+    """
+
+    def __init__(self, decimation: int = 1, capacity: int = 1 << 16, path: Optional[str] = None):
+        self.decimation = max(int(decimation), 1)
+        self.path = path  # written on save() if set, e.g. next to the results parquet
+        self._n = 0
+        self._pending_start = 0
+        self._tick = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self.cycle_id = np.empty(capacity, dtype=np.int32)
+        self.day = np.empty(capacity, dtype=np.int32)  # days since epoch
+        self.minute = np.empty(capacity, dtype=np.int16)  # minutes since midnight
+        self.mtm = np.empty(capacity, dtype=np.float32)
+        self.spot = np.empty(capacity, dtype=np.float32)
+        self.legs = np.empty(capacity, dtype=np.int16)
+
+    def _grow(self):
+        old = (self.cycle_id, self.day, self.minute, self.mtm, self.spot, self.legs)
+        self._alloc(len(self.mtm) * 2)
+        for new_arr, old_arr in zip((self.cycle_id, self.day, self.minute, self.mtm, self.spot, self.legs), old):
+            new_arr[:self._n] = old_arr[:self._n]
+
+    def __len__(self):
+        return self._n
+
+    def record(self, current_date: date, timestamp: str, mtm: float, spot: float, legs: int) -> None:
+        """
+        store one mark for the open cycle, keeping every decimation-th call
+        """
+        self._tick += 1
+        if (self._tick - 1) % self.decimation:
+            return
+        if self._n == len(self.mtm):
+            self._grow()
+        i = self._n
+        self.day[i] = np.datetime64(current_date, "D").astype(np.int64)
+        self.minute[i] = int(timestamp[:2]) * 60 + int(timestamp[3:5])
+        self.mtm[i] = mtm
+        self.spot[i] = spot if spot is not None else np.nan
+        self.legs[i] = legs
+        self._n += 1
+
+    def end_cycle(self, cycle_id: int) -> None:
+        """
+        tag the pending rows with the id the closed cycle was stored under
+        """
+        self.cycle_id[self._pending_start:self._n] = cycle_id
+        self._pending_start = self._n
+        self._tick = 0
+
+    def discard_cycle(self) -> None:
+        """
+        drop the pending rows of a cycle that was retracted
+        """
+        self._n = self._pending_start
+        self._tick = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        closed cycles' marks as a DataFrame
+        """
+        n = self._pending_start
+        return pd.DataFrame({
+            "cycle_id": self.cycle_id[:n],
+            "date": self.day[:n].astype("datetime64[D]"),
+            "minute": self.minute[:n],
+            "mtm": self.mtm[:n],
+            "spot": self.spot[:n],
+            "legs": self.legs[:n],
+        })
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        write closed cycles' marks as parquet (or .npz if the path says so)
+        """
+        path = path or self.path
+        if not path:
+            return
+        n = self._pending_start
+        if path.endswith(".npz"):
+            np.savez_compressed(
+                path, cycle_id=self.cycle_id[:n], day=self.day[:n], minute=self.minute[:n],
+                mtm=self.mtm[:n], spot=self.spot[:n], legs=self.legs[:n],
+            )
+        else:
+            self.to_frame().to_parquet(path, index=False, compression="zstd")
+        logging.info(f"Saved {n} MTM marks to {path}")
+
+    def cycle_stats(self) -> pd.DataFrame:
+        """
+        Per cycle MAE (worst mark), MFE (best mark) and intraday max drawdown
+        of the MTM path, from the recorded marks
+        """
+        n = self._pending_start
+        if not n:
+            return pd.DataFrame(columns=["cycle_id", "marks", "mae", "mfe", "max_drawdown"])
+        cycle_id = self.cycle_id[:n]
+        mtm = self.mtm[:n].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, cycle_id[1:] != cycle_id[:-1]])
+        counts = np.diff(np.r_[starts, n])
+
+        # running peak restarted at every cycle boundary: lift each cycle
+        # above everything before it so earlier peaks can't leak into it
+        offset = np.repeat(np.arange(len(starts)) * (2 * np.abs(mtm).max() + 1), counts)
+        peak = np.maximum.accumulate(mtm + offset) - offset
+        peak = np.maximum(peak, 0.0)  # cycles start flat
+        drawdown = peak - mtm
+
+        return pd.DataFrame({
+            "cycle_id": cycle_id[starts],
+            "marks": counts,
+            "mae": np.minimum.reduceat(mtm, starts),
+            "mfe": np.maximum.reduceat(mtm, starts),
+            "max_drawdown": np.maximum.reduceat(drawdown, starts),
+        })
+
+    def daily_pnl(self) -> pd.Series:
+        """
+        Mark-to-market pnl per day: change of each cycle's last mark of the
+        day, summed across cycles. Can be passed to analytics.summarize(daily=...)
+        """
+        df = self.to_frame()
+        if df.empty:
+            return pd.Series(dtype=np.float64)
+        last = df.groupby(["cycle_id", "date"], sort=True)["mtm"].last().astype(np.float64)
+        change = last.groupby(level="cycle_id").diff().fillna(last)
+        return change.groupby(level="date").sum()
@@ -2,10 +2,24 @@ import pandas as pd
 from datetime import datetime, date
 from typing import Dict, Tuple
 from genc import GenericStrategy
+from orders import MultiLegOrder, split_symbol
+from precompute import atm_series
+from strategy_classes import Straddle
+from signals import next_band_crossing
+import numpy as np
 import logging
 import time
 
 class OutSellStrategy(GenericStrategy):
+    uses_atm_series = True
+    track_greeks = True
+    # Legs sit within a hedge width of spot; load 8 strikes beyond the day's spot range
+    strike_window = 8
+    # Projection used when the engine loads days for this strategy (intraday mode)
+    columns = ["minute", "expiry", "strike", "spot_price", "put_position",
+               "call_close", "put_close", "put_delta", "put_iv", "call_delta", "call_iv",
+               "call_gamma", "put_gamma", "call_theta", "put_theta", "call_vega", "put_vega"]
+
     def __init__(self, data_dir: str, expiry_list):
         # Initialize parent class first
         super().__init__(data_dir, expiry_list)
@@ -22,6 +36,9 @@ class OutSellStrategy(GenericStrategy):
         self.spot=0
         self.initial_note_price=None
         self.roll=None
+        self.straddle_state=None
+        self.next_roll_time=None
+        self._roll_key=None
         #self.expiries_to_trade = None
         
     def get_atm_strike(self, data: pd.DataFrame, index: int =0) -> float:
@@ -34,6 +51,42 @@ class OutSellStrategy(GenericStrategy):
             return atm_data['strike'].iloc[0]
         return None
     
+    def get_atm(self, data: pd.DataFrame, timestamp: str) -> Dict:
+        """
+        ATM strike, straddle premium and hedge width at timestamp, read in
+        O(1) from the day's precomputed ATMSeries (built from data if the
+        engine didn't provide one)
+        """
+        series = self.atm_series if self.atm_series is not None else atm_series(data)
+        i = series.index_of(timestamp)
+        if i is None:
+            return None
+        self.straddle_state = Straddle().load(series, i)
+        return series.row(i)
+
+    def _set_position_details(self, order: MultiLegOrder, fills, atm: Dict, timestamp: str):
+        """
+        Keep per-leg entry details of a hedged straddle; greeks are only
+        noted for the two short ATM legs (the first two of the order)
+        """
+        details = []
+        for i, (strike, option_type, qty, price) in enumerate(
+            zip(order.strikes, order.option_types, order.quantities, fills)
+        ):
+            prefix = "put" if option_type == "PE" else "call"
+            details.append({
+                "strike": strike,
+                "option_type": option_type,
+                "quantity": qty,
+                "entry_price": price,
+                "expiry": self.current_expiry,
+                "entry_date": self.current_date,
+                "entry_time": timestamp,
+                "entry_delta": atm[f"{prefix}_delta"] if i < 2 else 0,
+                "entry_iv": atm[f"{prefix}_iv"] if i < 2 else 0,
+            })
+        self.position_details, self.position_details1, self.position_details2, self.position_details3 = details
+
     def entry(self, data: pd.DataFrame, timestamp: str) -> Dict:
         """
         Entry logic for put selling strategy:
@@ -47,32 +100,31 @@ class OutSellStrategy(GenericStrategy):
         #    if timestamp != "09:15:00":
          #       return None
             
-        atm_strike = self.get_atm_strike(data, 1)
-        if atm_strike is None:
+        atm = self.get_atm(data, timestamp)
+        if atm is None:
             logging.warning(f"Could not find ATM strike at {timestamp}")
-            return None  
+            return None
+        atm_strike = atm["strike"]  
         self.selected_strike = atm_strike
         self.position_expiry = self.current_expiry
         self.entry_date = self.current_date
         
-        put_data = data[data['strike'] == atm_strike]  # Only filter by strike
-        
-        if put_data.empty:
-            return None
-            
-        self.entry_price = put_data['put_close'].iloc[0] 
+        self.entry_price = atm['put_close']
          # Using put_close as the entry price
-        self.entry_price_ce=put_data["call_close"].iloc[0]
+        self.entry_price_ce=atm["call_close"]
 
-        straddle=self.entry_price+self.entry_price_ce
-        hedge=int(50*round(straddle/50))
+        straddle=atm["straddle"]
+        hedge=int(atm["hedge"])
 
         self.roll=hedge
         ce_hedge=atm_strike+hedge
         pe_hedge=atm_strike-hedge
 
-        ce_hprice=data[data["strike"]==ce_hedge]["call_close"].iloc[0]
-        pe_hprice=data[data["strike"]==pe_hedge]["put_close"].iloc[0]
+        order = MultiLegOrder.hedged_straddle(atm_strike, hedge, quantity=1)
+        fills = self.place_legs(order, data, timestamp)
+        if fills is None:
+            return None
+        pe_hprice, ce_hprice = fills[2], fills[3]
 
         self.initial_note_price=self.spot
 
@@ -86,89 +138,7 @@ class OutSellStrategy(GenericStrategy):
        
         
         # Save full position details
-        self.position_details = {
-            "strike": atm_strike,
-            "option_type": "PE",
-            "quantity": 1,  
-            "entry_price": self.entry_price,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": put_data['put_delta'].iloc[0],
-            "entry_iv": put_data['put_iv'].iloc[0]
-        }
-        self.position_details1 = {
-            "strike": atm_strike,
-            "option_type": "CE",
-            "quantity": 1,  
-            "entry_price": self.entry_price_ce,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": put_data['call_delta'].iloc[0],
-            "entry_iv": put_data['call_iv'].iloc[0]
-        }
-        self.position_details2 = {
-            "strike": pe_hedge,
-            "option_type": "PE",
-            "quantity": 1,  
-            "entry_price":pe_hprice,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": 0,
-            "entry_iv": 0
-        }
-        self.position_details3 = {
-            "strike": ce_hedge,
-            "option_type": "CE",
-            "quantity": 1,  
-            "entry_price": ce_hprice,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta":0,
-            "entry_iv": 0
-        }
-
-        if self.position_details:
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details['strike']}|{self.position_details['option_type']}",
-            expiry=self.position_details['expiry'],
-            strike=self.position_details['strike'],
-            entry_price=self.position_details['entry_price'],
-            quantity=self.position_details['quantity'],
-            order="sell"
-                        )
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details1['strike']}|{self.position_details1['option_type']}",
-            expiry=self.position_details1['expiry'],
-            strike=self.position_details1['strike'],
-            entry_price=self.position_details1['entry_price'],
-            quantity=self.position_details1['quantity'],
-            order="sell",
-                        )
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details2['strike']}|{self.position_details2['option_type']}",
-            expiry=self.position_details2['expiry'],
-            strike=self.position_details2['strike'],
-            entry_price=self.position_details2['entry_price'],
-            quantity=self.position_details2['quantity'],
-            order="buy"
-                        )
-            
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details3['strike']}|{self.position_details3['option_type']}",
-            expiry=self.position_details3['expiry'],
-            strike=self.position_details3['strike'],
-            entry_price=self.position_details3['entry_price'],
-            quantity=self.position_details3['quantity'],
-            order="buy"
-                        )
+        self._set_position_details(order, fills, atm, timestamp)
 
 
        
@@ -176,7 +146,7 @@ class OutSellStrategy(GenericStrategy):
         
         logging.info(f" {self.current_date} : {self.current_time}:Entry signal: Selling ATM PUT at strike {atm_strike}, current date is {self.current_date} "
              f"price {self.entry_price}, expiry {self.current_expiry}, "
-             f"delta {put_data['put_delta'].iloc[0]:.2f}, IV {put_data['put_iv'].iloc[0]:.2f}"),
+             f"delta {atm['put_delta']:.2f}, IV {atm['put_iv']:.2f}"),
 
         
         return self.position_details
@@ -191,131 +161,94 @@ class OutSellStrategy(GenericStrategy):
         
         self.initial_note_price=self.spot
             
-        atm_strike = self.get_atm_strike(data, 1)
-        if atm_strike is None:
+        atm = self.get_atm(data, timestamp)
+        if atm is None:
             logging.warning(f"Could not find ATM strike at {timestamp}")
             return None
+        atm_strike = atm["strike"]
             
         self.selected_strike = atm_strike
         self.position_expiry = self.current_expiry
         self.entry_date = self.current_date
         
-        put_data = data[data['strike'] == atm_strike]  # Only filter by strike
-        
-        if put_data.empty:
-            return None
-            
-        self.entry_price = put_data['put_close'].iloc[0] 
+        self.entry_price = atm['put_close']
          # Using put_close as the entry price
-        self.entry_price_ce=put_data["call_close"].iloc[0]
+        self.entry_price_ce=atm["call_close"]
 
-        straddle=self.entry_price+self.entry_price_ce
-        hedge=int(50*round(straddle/50))
+        straddle=atm["straddle"]
+        hedge=int(atm["hedge"])
         ce_hedge=atm_strike+hedge
         pe_hedge=atm_strike-hedge
 
         self.roll=hedge
 
-        ce_hprice=data[data["strike"]==ce_hedge]["call_close"].iloc[0]
-        pe_hprice=data[data["strike"]==pe_hedge]["put_close"].iloc[0]
+        order = MultiLegOrder.hedged_straddle(atm_strike, hedge, quantity=1)
+        fills = self.place_legs(order, data, timestamp)
+        if fills is None:
+            return None
+        pe_hprice, ce_hprice = fills[2], fills[3]
 
 
         print(self.spot,straddle,ce_hedge,pe_hedge,ce_hprice,pe_hprice)
         print(self.entry_price,self.entry_price_ce)
-        self.position_details = {
-            "strike": atm_strike,
-            "option_type": "PE",
-            "quantity": 1,  
-            "entry_price": self.entry_price,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": put_data['put_delta'].iloc[0],
-            "entry_iv": put_data['put_iv'].iloc[0]
-        }
-        self.position_details1 = {
-            "strike": atm_strike,
-            "option_type": "CE",
-            "quantity": 1,  
-            "entry_price": self.entry_price_ce,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": put_data['call_delta'].iloc[0],
-            "entry_iv": put_data['call_iv'].iloc[0]
-        }
-        self.position_details2 = {
-            "strike": pe_hedge,
-            "option_type": "PE",
-            "quantity": 1,  
-            "entry_price":pe_hprice,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta": 0,
-            "entry_iv": 0
-        }
-        self.position_details3 = {
-            "strike": ce_hedge,
-            "option_type": "CE",
-            "quantity": 1,  
-            "entry_price": ce_hprice,
-            "expiry": self.current_expiry,
-            "entry_date": self.current_date,
-            "entry_time": timestamp,
-            "entry_delta":0,
-            "entry_iv": 0
-        }
-
-        if self.position_details:
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details['strike']}|{self.position_details['option_type']}",
-            expiry=self.position_details['expiry'],
-            strike=self.position_details['strike'],
-            entry_price=self.position_details['entry_price'],
-            quantity=self.position_details['quantity'],
-            order="sell"
-                        )
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details1['strike']}|{self.position_details1['option_type']}",
-            expiry=self.position_details1['expiry'],
-            strike=self.position_details1['strike'],
-            entry_price=self.position_details1['entry_price'],
-            quantity=self.position_details1['quantity'],
-            order="sell"
-                        )
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details2['strike']}|{self.position_details2['option_type']}",
-            expiry=self.position_details2['expiry'],
-            strike=self.position_details2['strike'],
-            entry_price=self.position_details2['entry_price'],
-            quantity=self.position_details2['quantity'],
-            order="buy"
-                        )
-            
-            self.enter_position(
-            timestamp=timestamp,
-            symbol=f"{self.position_details3['strike']}|{self.position_details3['option_type']}",
-            expiry=self.position_details3['expiry'],
-            strike=self.position_details3['strike'],
-            entry_price=self.position_details3['entry_price'],
-            quantity=self.position_details3['quantity'],
-            order="buy"
-                        )
+        self._set_position_details(order, fills, atm, timestamp)
             
        
         
         logging.info(f" {self.current_date} : {self.current_time}:Entry signal: Selling ATM PUT at strike {atm_strike}, current date is {self.current_date} "
              f"price {self.entry_price}, expiry {self.current_expiry}, "
-             f"delta {put_data['put_delta'].iloc[0]:.2f}, IV {put_data['put_iv'].iloc[0]:.2f}"),
+             f"delta {atm['put_delta']:.2f}, IV {atm['put_iv']:.2f}"),
 
         
         return self.position_details
     
 
+    def roll_due(self, timestamp: str) -> bool:
+        """
+        True when spot has moved a full roll away from initial_note_price.
+        With a day's ATMSeries the next crossing minute is found with one
+        vectorized search whenever the anchor, band or series changes; every
+        other minute is a single compare against that minute.
+        The driver still visits every minute, since the SL/target check
+        needs per-minute mtm, so a day costs O(minutes), not O(rolls);
+        only the roll test itself became O(1) per minute.
+        """
+        series = self.atm_series
+        if series is not None:
+            # the series object itself, not id(): a freed day's id can be reused by the next day's series
+            key = (series, self.initial_note_price, self.roll)
+            if key != self._roll_key:
+                self._schedule_roll(series, timestamp)
+            if self.next_roll_time is None or timestamp < self.next_roll_time:
+                return False
+
+        crossed = (self.spot>=self.initial_note_price+self.roll) or (self.spot<=self.initial_note_price-self.roll)
+        if series is not None and not crossed:
+            # the scheduled minute was skipped (no mtm) and spot came back, look further
+            self._schedule_roll(series, timestamp, after=True)
+        return crossed
+
+    def _schedule_roll(self, series, timestamp: str, after: bool = False):
+        """
+        find the next roll minute at (or strictly after) timestamp
+        """
+        self._roll_key = (series, self.initial_note_price, self.roll)
+        side = "right" if after else "left"
+        start = int(np.searchsorted(series.minutes, timestamp, side=side))
+        i = next_band_crossing(series["spot_price"], self.initial_note_price, self.roll, start)
+        self.next_roll_time = series.minutes[i] if i != -1 else None
+
+    def held_prices(self, data: pd.DataFrame) -> Dict:
+        """
+        {strike: (call_close, put_close)} of the strikes with open legs only,
+        so the per-minute mtm costs the number of legs, not of strikes
+        """
+        held = [split_symbol(symbol)[0] for symbol in self.tb.open_positions]
+        strikes = data["strike"].to_numpy()
+        mask = np.isin(strikes, held)
+        return dict(zip(strikes[mask].tolist(), zip(data["call_close"].to_numpy()[mask].tolist(),
+                                                     data["put_close"].to_numpy()[mask].tolist())))
+
     def adjust(self, position: Dict, data: pd.DataFrame, timestamp: str) -> Dict:
         """
         Adjustment logic for the position
@@ -325,13 +258,14 @@ class OutSellStrategy(GenericStrategy):
             return None
 
         try:
-            pnl = self.tb.mtm(prices= dict(zip(data["strike"], zip(data["call_close"], data["put_close"]))))
+            pnl = self.tb.mtm(prices=self.held_prices(data))
         except:
             pnl={}
         
         if pnl:
             sum_pnl=sum(pnl.values())
-            if (self.spot>=self.initial_note_price+self.roll) or (self.spot<=self.initial_note_price-self.roll):
+            self.record_mtm(timestamp, sum_pnl)
+            if self.roll_due(timestamp):
                 self.enter_more(data,timestamp)
                 self.initial_note_price=self.spot
            
@@ -368,37 +302,43 @@ class OutSellStrategy(GenericStrategy):
         current_price = current_data['put_close'].iloc[0]
 
 
-        pnl = self.tb.mtm(prices= dict(zip(data["strike"], zip(data["call_close"], data["put_close"]))))
+        pnl = self.tb.mtm(prices=self.held_prices(data))
        
         sum_pnl=sum(pnl.values())
         days_held=0
         pnl_percentage=1
         delta_change=1.5
-        delta=1
-        vega=8
-        theta=15
+        greeks=self.greeks or {}
+        delta=greeks.get("delta", 0)
+        vega=greeks.get("vega", 0)
+        theta=greeks.get("theta", 0)
         iv_change=0
         tte=5
         iv=5
         if exit_message:
-            for pos,qty in self.tb.positions.items():
-                strike, option_type = pos.split("|")
+            # close every leg in one batch, priced with one lookup on this bar
+            symbols=list(self.tb.positions)
+            legs=MultiLegOrder()
+            for pos in symbols:
+                qty=self.tb.positions[pos]
+                strike, option_type, expiry = split_symbol(pos)
                 side="sell" if qty>0 else "buy"
-                dbb=data[data["strike"]==int(strike)]
-                #print(dbb)
-                index_="call_close" if option_type=="CE" else "put_close"
-                price=dbb[index_].iloc[0]
-                #print(pos,strike,price)
-                qty=qty*(-1) if side=="buy" else qty*(1)
-                self.tb.add_trade(
-                            timestamp=str(self.current_date) + self.current_time,
-                            symbol=pos,
-                            price=price,
-                            qty=qty,
-                            order=side,
-                            expiry=self.position_expiry,
-                            strike=strike,
-                        )
+                legs.add(strike, option_type, side, abs(qty), expiry=expiry)
+            # priced like entries, so exits get the same spot/spread slippage
+            fills=self._leg_fills(legs, data, timestamp)
+            if fills is None:
+                logging.warning(f"Could not price all legs to exit at {timestamp}")
+                return False
+            self.submit_fills(
+                        timestamp=str(self.current_date) + self.current_time,
+                        symbols=symbols,
+                        prices=fills[0],
+                        qtys=legs.quantities,
+                        orders=legs.sides,
+                        market=fills[1],
+                        expiry=[e or self.position_expiry for e in legs.expiries],
+                        strike=legs.strikes,
+                    )
 
             
 
@@ -407,7 +347,7 @@ class OutSellStrategy(GenericStrategy):
                 f"Position held for {days_held} days\n"
                 f"P&L: {sum_pnl:.2f} ({pnl_percentage:.2f}%)\n"
                 f"Greeks: Delta={delta:.2f} ({delta_change:+.2f}), "
-                f"Theta={theta:.2f}, Vega={vega:.2f}\n"
+                f"Gamma={greeks.get('gamma', 0):.4f}, Theta={theta:.2f}, Vega={vega:.2f}\n"
                 f"IV: {iv:.2f}% ({iv_change:+.2f}%)\n"
                 f"Time to expiry: {tte:.2f} days"
             )
@@ -430,41 +370,24 @@ class OutSellStrategy(GenericStrategy):
     
         
    
-    def run_strategy(self, current_data: pd.DataFrame,update_time: str = None) -> bool:
+    def on_bar(self, bar: pd.DataFrame, timestamp: str) -> bool:
         """
-        Run the strategy for the current data
+        One minute of the chain: enter when flat, otherwise update greeks
+        and run the adjustments
         Returns: True if strategy has exited position, False if still holding or no position
         """
-       # print(self.expiries_to_trade,'scvbvjvcv')
+        self.current_time=timestamp
+        self.spot=bar["spot_price"].iloc[0]
 
+        if not self.tb.open_positions:
+            if not self.exit_signal: 
+                self.entry(bar, timestamp)# Only try to enter if we haven't just exited
         
-        
-        if update_time:
-            unique_minutes = sorted([m for m in current_data["minute"].unique() if m > update_time])
-        else:
-            unique_minutes = sorted(current_data["minute"].unique())
-
-        for timestamp in unique_minutes: 
-            self.current_time=timestamp
-            current_data_at_time = current_data[current_data["minute"] == timestamp]
-            
-            
-            self.spot=current_data_at_time["spot_price"].iloc[0]
-
-         #   strike_data = dict(zip(current_data_at_time['strike'], [{'put_close': put, 'put_delta': delta, 'put_gamma': gamma, 'theta': theta, 'vega': vega} 
-          #                            for put, delta, gamma, theta, vega in zip(current_data_at_time['put_close'], current_data_at_time['put_delta'], 
-           #                           current_data_at_time['put_gamma'], current_data_at_time['put_theta'], current_data_at_time['put_vega'])]))
-
-            
-            if not self.tb.open_positions:
-                if not self.exit_signal: 
-                    self.entry(current_data_at_time, timestamp)# Only try to enter if we haven't just exited
-            
-            elif self.tb.open_positions:
-                current_position = self.tb.positions
-                if self.adjust(current_position,current_data_at_time,timestamp):
-                    return True 
-             
+        elif self.tb.open_positions:
+            current_position = self.tb.positions
+            self.update_greeks(bar, timestamp)
+            if self.adjust(current_position,bar,timestamp):
+                return True 
 
         # Return false if we're still holding position or didn't enter
         return False
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+
+def split_symbol(symbol: str) -> Tuple[int, str, Optional[str]]:
+    """
+    strike, option type and expiry of a tradebook symbol; the expiry is None
+    for plain "strike|CE" symbols, which trade the cycle's own expiry
+    """
+    parts = symbol.split("|")
+    return int(parts[0]), parts[1], parts[2] if len(parts) > 2 else None
+
+
+class MultiLegOrder:
+    """
+    A set of option legs placed together at one timestamp.
+    Each leg is strike, option_type ("CE"/"PE"), side ("buy"/"sell"), quantity
+    and optionally its own expiry, for calendar spreads and overlapping cycles.
+    Legs with an expiry trade as "strike|CE|expiry" symbols.
+    """
+
+    def __init__(self, legs: Optional[List[Dict]] = None):
+        self.strikes = []
+        self.option_types = []
+        self.sides = []
+        self.quantities = []
+        self.expiries = []
+        for leg in legs or []:
+            self.add(**leg)
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def __repr__(self):
+        legs = ", ".join(
+            f"{side} {qty} {symbol}"
+            for symbol, side, qty in zip(self.symbols, self.sides, self.quantities)
+        )
+        return f"MultiLegOrder({legs})"
+
+    def add(self, strike, option_type: str, side: str = "sell", quantity: int = 1, expiry: Optional[str] = None) -> "MultiLegOrder":
+        self.strikes.append(strike)
+        self.option_types.append(option_type.upper())
+        self.sides.append(side)
+        self.quantities.append(quantity)
+        self.expiries.append(expiry)
+        return self
+
+    def by_expiry(self) -> Dict[Optional[str], Tuple[List[int], "MultiLegOrder"]]:
+        """
+        leg positions and sub-order of every expiry the legs trade, None for
+        legs without their own expiry
+        """
+        groups = {}
+        for i, expiry in enumerate(self.expiries):
+            groups.setdefault(expiry, []).append(i)
+        return {
+            expiry: (idx, MultiLegOrder([
+                {"strike": self.strikes[i], "option_type": self.option_types[i],
+                 "side": self.sides[i], "quantity": self.quantities[i]} for i in idx
+            ]))
+            for expiry, idx in groups.items()
+        }
+
+    @classmethod
+    def hedged_straddle(cls, atm_strike, hedge: int, quantity: int = 1) -> "MultiLegOrder":
+        """
+        short ATM PE and CE, long PE at atm - hedge and CE at atm + hedge
+        """
+        return cls([
+            {"strike": atm_strike, "option_type": "PE", "side": "sell", "quantity": quantity},
+            {"strike": atm_strike, "option_type": "CE", "side": "sell", "quantity": quantity},
+            {"strike": atm_strike - hedge, "option_type": "PE", "side": "buy", "quantity": quantity},
+            {"strike": atm_strike + hedge, "option_type": "CE", "side": "buy", "quantity": quantity},
+        ])
+
+    @property
+    def symbols(self) -> List[str]:
+        return [
+            f"{strike}|{ot}|{expiry}" if expiry else f"{strike}|{ot}"
+            for strike, ot, expiry in zip(self.strikes, self.option_types, self.expiries)
+        ]
+
+    def resolve_rows(self, data: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Row position of every leg's strike in one bar (one row per strike),
+        found with a single searchsorted. None if any strike is missing.
+        """
+        bar_strikes = data["strike"].to_numpy()
+        order = np.argsort(bar_strikes, kind="stable")
+        sorted_strikes = bar_strikes[order]
+        wanted = np.asarray(self.strikes, dtype=sorted_strikes.dtype)
+        pos = np.searchsorted(sorted_strikes, wanted)
+        pos[pos == len(sorted_strikes)] = 0
+        if not len(sorted_strikes) or not np.all(sorted_strikes[pos] == wanted):
+            return None
+        return order[pos]
+
+    def leg_values(self, data: pd.DataFrame, rows: np.ndarray, call_column: str, put_column: str) -> np.ndarray:
+        """
+        per-leg value of the call or put column, depending on the leg's option type
+        """
+        is_call = np.array([ot == "CE" for ot in self.option_types])
+        return np.where(is_call, data[call_column].to_numpy()[rows], data[put_column].to_numpy()[rows])
+
+    def resolve_prices(self, data: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Every leg's close in one bar, None if any leg's strike is not in the bar
+        """
+        rows = self.resolve_rows(data)
+        if rows is None:
+            return None
+        return self.leg_values(data, rows, "call_close", "put_close")
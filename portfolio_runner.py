@@ -0,0 +1,103 @@
+import logging
+from datetime import date, timedelta
+from typing import Dict, Optional
+from genc import GenericStrategy
+
+
+class DayStore:
+    """
+    Memo of everything loaded for the current day (expiry lists, expiry
+    chains, per-minute views, ATM series), shared by the engines of a
+    PortfolioRunner. Cleared when the day changes.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.items = {}
+        self.loads = 0
+        self.hits = 0
+
+    def begin_day(self, day: date):
+        if day != self.day:
+            self.items.clear()
+            self.day = day
+
+    def get(self, key, loader):
+        if key in self.items:
+            self.hits += 1
+            return self.items[key]
+        value = loader()
+        self.items[key] = value
+        self.loads += 1
+        return value
+
+
+class PortfolioRunner:
+    """
+    Run several strategies over the same dates in one pass. Each strategy
+    gets its own engine (tradebook, cycle state, sinks); the engines share
+    a DayStore, so each day and expiry is read and split into minutes once
+    however many strategies use it.
+
+        runner = PortfolioRunner(data_dir, expiry_list_file)
+        runner.add(strategy.OutSellStrategy, name="put_sell")
+        runner.add(new_strategy.OutSellStrategy, name="straddle", cost_model=CostModel())
+        engines = runner.run(start, end)
+        engines["straddle"].all_tradebooks
+    """
+
+    def __init__(self, data_dir: str, expiry_list_file: str, is_intraday: bool = False):
+        self.data_dir = data_dir
+        self.expiry_list_file = expiry_list_file
+        self.is_intraday = is_intraday
+        self.store = DayStore()
+        self.engines: Dict[str, GenericStrategy] = {}
+        self._runs = []
+
+    def add(self, strategy_class, name: Optional[str] = None, results_sink=None, mtm_recorder=None,
+            record_greeks: bool = False, cost_model=None, **params) -> GenericStrategy:
+        """
+        Add a strategy; params are set as attributes on each of its instances.
+        Returns the strategy's engine.
+        """
+        name = name or f"{strategy_class.__module__}.{strategy_class.__name__}"
+        if name in self.engines:
+            raise ValueError(f"strategy name {name} already added")
+        engine = GenericStrategy(self.data_dir, self.expiry_list_file, is_intraday=self.is_intraday)
+        engine.day_store = self.store
+        engine.strategy_params = params
+        self.engines[name] = engine
+        self._runs.append((engine, strategy_class, (results_sink, mtm_recorder, record_greeks, cost_model)))
+        return engine
+
+    def run(self, start_date: date, end_date: date) -> Dict[str, GenericStrategy]:
+        """
+        Step every strategy through each day before moving to the next one.
+        Returns the engines by name.
+        """
+        for engine, strategy_class, settings in self._runs:
+            engine._start_run(strategy_class, *settings)
+
+        current_date = start_date
+        while current_date <= end_date:
+            self.store.begin_day(current_date)
+            for engine, strategy_class, _ in self._runs:
+                if self.is_intraday:
+                    if current_date.weekday() < 5:
+                        self._run_intraday_day(engine, strategy_class, current_date)
+                else:
+                    engine.step_day(current_date)
+            current_date += timedelta(days=1)
+
+        for engine, _, _ in self._runs:
+            engine._finish_run()
+        logging.info(f"Portfolio run of {len(self._runs)} strategies: {self.store.loads} loads, {self.store.hits} shared")
+        return self.engines
+
+    @staticmethod
+    def _run_intraday_day(engine: GenericStrategy, strategy_class, day: date):
+        tb = engine.run_day(day, strategy_class)
+        if tb is not None:
+            engine._store_tradebook(tb)
+        elif engine.mtm_recorder is not None:
+            engine.mtm_recorder.discard_cycle()
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+
+class ATMSeries:
+    """
+    Per-minute ATM strike, ATM straddle premium and derived hedge strikes
+    for one (day, expiry) chain, as aligned arrays indexed by minute.
+    """
+
+    columns = ["strike", "put_close", "call_close", "put_delta", "put_iv", "call_delta", "call_iv",
+               "spot_price", "straddle", "hedge", "ce_hedge", "pe_hedge"]
+
+    def __init__(self, minutes: np.ndarray, arrays: Dict[str, np.ndarray]):
+        self.minutes = minutes
+        self.arrays = arrays
+        self._index = {m: i for i, m in enumerate(minutes)}
+
+    def __len__(self):
+        return len(self.minutes)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.arrays[column]
+
+    def index_of(self, timestamp: str) -> Optional[int]:
+        """
+        position of a minute in the arrays, None if the minute has no ATM row
+        """
+        return self._index.get(timestamp)
+
+    def row(self, i: int) -> Dict:
+        return {k: v[i] for k, v in self.arrays.items()}
+
+    def at(self, timestamp: str) -> Optional[Dict]:
+        """
+        entry parameters at a minute in O(1), None if not available
+        """
+        i = self._index.get(timestamp)
+        return self.row(i) if i is not None else None
+
+
+def atm_series(data: pd.DataFrame, atm_position: int = 1, hedge_step: int = 50) -> ATMSeries:
+    """
+    Build the ATMSeries of a day's chain for one expiry in one pass.
+    ATM is the first row of each minute with put_position == atm_position
+    (as OutSellStrategy.get_atm_strike picks it); the hedge width is the
+    straddle premium rounded to hedge_step.
+    """
+    cols = [c for c in ATMSeries.columns[:8] if c in data.columns]
+    atm = data.loc[data["put_position"].to_numpy() == atm_position, ["minute"] + cols]
+    atm = atm.drop_duplicates("minute", keep="first").sort_values("minute", kind="stable")
+
+    arrays = {c: atm[c].to_numpy() for c in cols}
+    straddle = arrays["put_close"] + arrays["call_close"]
+    hedge = (hedge_step * np.round(straddle / hedge_step)).astype(np.int64)
+    arrays["straddle"] = straddle
+    arrays["hedge"] = hedge
+    arrays["ce_hedge"] = arrays["strike"] + hedge
+    arrays["pe_hedge"] = arrays["strike"] - hedge
+    return ATMSeries(atm["minute"].to_numpy(), arrays)
+
+
+def minute_views(data: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    one frame per minute of a day's chain, split with a single groupby so
+    strategies don't re-filter the whole day on every bar
+    """
+    if data is None or data.empty:
+        return {}
+    return {minute: rows for minute, rows in data.groupby("minute", sort=True, observed=True)}
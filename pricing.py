@@ -0,0 +1,211 @@
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from datetime import date, datetime
+from typing import Dict, Optional
+
+GREEK_COLUMNS = [f"{side}_{g}" for side in ("call", "put") for g in ("iv", "delta", "gamma", "theta", "vega")]
+KEYS = ["expiry", "minute", "strike"]
+MIN_VOL, MAX_VOL = 1e-4, 5.0
+MIN_T = 1e-6  # years, keeps expiry-day minutes finite
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """
+    standard normal cdf (Abramowitz & Stegun 26.2.17, abs error < 7.5e-8)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    k = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = k * (0.319381530 + k * (-0.356563782 + k * (1.781477937 + k * (-1.821255978 + k * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+def _d1_d2(spot, strike, t, vol, rate):
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / (vol * sqrt_t)
+    return d1, d1 - vol * sqrt_t
+
+
+def bs_price(spot, strike, t, vol, rate, is_call) -> np.ndarray:
+    """
+    black-scholes price of calls (is_call True) and puts, element-wise
+    """
+    d1, d2 = _d1_d2(spot, strike, t, vol, rate)
+    disc = strike * np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - disc * norm_cdf(d2)
+    put = disc * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_vol(price, spot, strike, t, rate, is_call, tol: float = 1e-6, max_iter: int = 50) -> np.ndarray:
+    """
+    Batched implied vol: Newton steps safeguarded by a bisection bracket,
+    all options solved together. Prices outside the no-arbitrage bounds
+    give NaN.
+    """
+    price, spot, strike, t = (np.asarray(a, dtype=np.float64) for a in (price, spot, strike, t))
+    is_call = np.asarray(is_call, dtype=bool)
+    t = np.maximum(t, MIN_T)
+    disc = strike * np.exp(-rate * t)
+    lower_bound = np.where(is_call, np.maximum(spot - disc, 0.0), np.maximum(disc - spot, 0.0))
+    upper_bound = np.where(is_call, spot, disc)
+    valid = (price > lower_bound) & (price < upper_bound) & (spot > 0) & (strike > 0)
+
+    lo = np.full(price.shape, MIN_VOL)
+    hi = np.full(price.shape, MAX_VOL)
+    vol = np.full(price.shape, 0.2)
+    active = valid.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        s, k, tt, v, c = spot[active], strike[active], t[active], vol[active], is_call[active]
+        diff = bs_price(s, k, tt, v, rate, c) - price[active]
+        d1, _ = _d1_d2(s, k, tt, v, rate)
+        vega = s * norm_pdf(d1) * np.sqrt(tt)
+
+        # shrink the bracket, then take the newton step if it stays inside it
+        high = diff > 0
+        hi[active] = np.where(high, v, hi[active])
+        lo[active] = np.where(high, lo[active], v)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = v - diff / vega
+        inside = (vega > 1e-12) & (step > lo[active]) & (step < hi[active])
+        priced = np.abs(diff) < tol
+        new_vol = np.where(priced, v, np.where(inside, step, 0.5 * (lo[active] + hi[active])))
+        vol[active] = new_vol
+
+        done = priced | (np.abs(new_vol - v) < tol * 1e-2)
+        idx = np.flatnonzero(active)
+        active[idx[done]] = False
+
+    return np.where(valid, vol, np.nan)
+
+
+def bs_greeks(spot, strike, t, vol, rate, is_call) -> Dict[str, np.ndarray]:
+    """
+    Delta, gamma, theta (per calendar day) and vega (per vol point)
+    """
+    t = np.maximum(np.asarray(t, dtype=np.float64), MIN_T)
+    d1, d2 = _d1_d2(spot, strike, t, vol, rate)
+    pdf = norm_pdf(d1)
+    sqrt_t = np.sqrt(t)
+    disc = strike * np.exp(-rate * t)
+    gamma = pdf / (spot * vol * sqrt_t)
+    vega = spot * pdf * sqrt_t / 100.0
+    decay = -spot * pdf * vol / (2.0 * sqrt_t)
+    call_theta = (decay - rate * disc * norm_cdf(d2)) / 365.0
+    put_theta = (decay + rate * disc * norm_cdf(-d2)) / 365.0
+    return {
+        "delta": np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0),
+        "gamma": gamma,
+        "theta": np.where(is_call, call_theta, put_theta),
+        "vega": vega,
+    }
+
+
+def _tte_years(df: pd.DataFrame, trade_date: Optional[date], tte_unit: str) -> np.ndarray:
+    if "tte" in df:
+        tte = df["tte"].to_numpy(np.float64)
+        return tte / 365.0 if tte_unit == "days" else tte
+    if trade_date is None:
+        raise ValueError("chain has no tte column, trade_date is needed to derive it")
+    # time left until 15:30 on expiry day
+    expiry_close = pd.to_datetime(df["expiry"].astype(str).str.slice(0, 10)) + pd.Timedelta(hours=15, minutes=30)
+    now = pd.to_datetime(str(trade_date) + " " + df["minute"].astype(str))
+    return ((expiry_close - now).dt.total_seconds() / (365.0 * 86400.0)).to_numpy(np.float64)
+
+
+def chain_greeks(df: pd.DataFrame, rate: float = 0.0, trade_date: Optional[date] = None,
+                 tte_unit: str = "days", columns=None) -> pd.DataFrame:
+    """
+    IV and greeks of every call and put in a chain frame, computed for the
+    whole frame at once. Only the requested columns (default: the ones the
+    frame lacks) are returned, aligned with df's rows.
+    """
+    columns = [c for c in (columns or GREEK_COLUMNS) if columns or c not in df]
+    out = pd.DataFrame(index=df.index)
+    if not columns:
+        return out
+
+    n = len(df)
+    spot = np.tile(df["spot_price"].to_numpy(np.float64), 2)
+    strike = np.tile(df["strike"].to_numpy(np.float64), 2)
+    t = np.maximum(np.tile(_tte_years(df, trade_date, tte_unit), 2), MIN_T)
+    is_call = np.r_[np.ones(n, bool), np.zeros(n, bool)]
+    price = np.r_[df["call_close"].to_numpy(np.float64), df["put_close"].to_numpy(np.float64)]
+
+    vol = implied_vol(price, spot, strike, t, rate, is_call)
+    greeks = bs_greeks(spot, strike, t, vol, rate, is_call)
+    greeks["iv"] = vol
+    for col in columns:
+        side, g = col.split("_", 1)
+        values = greeks[g]
+        out[col] = values[:n] if side == "call" else values[n:]
+    return out
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    sha1 of a file's content
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+_hashes = {}
+
+
+def cached_file_hash(path: str) -> str:
+    """
+    file_hash memoized on the file's size and mtime, so an unchanged file
+    is hashed once per process
+    """
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    fp = (st.st_size, st.st_mtime_ns)
+    cached = _hashes.get(key)
+    if cached is None or cached[0] != fp:
+        cached = _hashes[key] = (fp, file_hash(path))
+    return cached[1]
+
+
+def greeks_sidecar(path: str, cache_dir: Optional[str] = None, rate: float = 0.0, tte_unit: str = "days") -> Optional[str]:
+    """
+    Path of a sidecar parquet holding the greek columns the chain file at
+    path lacks, keyed by (expiry, minute, strike). The sidecar name carries
+    the source file's hash so a changed file is recomputed. Returns None if
+    the chain already has every column.
+    """
+    present = set(pq.read_schema(path).names)
+    missing = [c for c in GREEK_COLUMNS if c not in present]
+    if not missing:
+        return None
+
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), ".greeks")
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    sidecar = os.path.join(cache_dir, f"{stem}.{cached_file_hash(path)[:16]}.greeks.parquet")
+    if os.path.exists(sidecar):
+        return sidecar
+
+    needed = KEYS + ["spot_price", "call_close", "put_close"] + (["tte"] if "tte" in present else [])
+    df = pd.read_parquet(path, columns=needed)
+    try:
+        trade_date = datetime.strptime(stem, "%Y-%m-%d").date()
+    except ValueError:
+        trade_date = None
+    out = chain_greeks(df, rate=rate, trade_date=trade_date, tte_unit=tte_unit, columns=missing)
+    pd.concat([df[KEYS], out], axis=1).to_parquet(sidecar, index=False)
+    logging.info(f"Computed {missing} for {path} into {sidecar}")
+    return sidecar
@@ -0,0 +1,235 @@
+import os
+import asyncio
+import logging
+import time
+import datetime
+from datetime import date, timedelta
+from typing import Dict, NamedTuple, Optional
+import duckdb
+import pandas as pd
+from genc import GenericStrategy
+from precompute import minute_views
+
+
+class DayStart(NamedTuple):
+    day: date
+    expiries: Dict[int, str]  # nearest_expiry rank -> expiry
+
+
+class Bar(NamedTuple):
+    day: date
+    minute: str
+    chain: pd.DataFrame  # every strike of every streamed expiry at this minute
+    emitted_ns: int  # time.perf_counter_ns() when the bar was put on the queue
+
+
+class DayEnd(NamedTuple):
+    day: date
+
+
+class ReplayFeed:
+    """
+    Replays the daily {date}.parquet chains as a live feed: per-minute chain
+    snapshots put on an asyncio.Queue, framed by DayStart/DayEnd, then None.
+
+    speed is None for unthrottled replay, 1.0 for real time (a minute bar
+    every 60s) and e.g. 60.0 for a minute per second. Only expiries with
+    nearest_expiry <= max_rank are streamed.
+    """
+
+    def __init__(self, data_dir: str, start_date: date, end_date: date, speed: Optional[float] = None,
+                 max_rank: int = 2, columns=None):
+        self.data_dir = data_dir
+        self.start_date = start_date
+        self.end_date = end_date
+        self.speed = speed
+        self.max_rank = max_rank
+        self.columns = columns
+        self.bars_sent = 0
+
+    def load_day(self, day: date) -> Optional[pd.DataFrame]:
+        path = os.path.join(self.data_dir, f'{day.strftime("%Y-%m-%d")}.parquet')
+        if not os.path.exists(path):
+            return None
+        select = "*"
+        if self.columns:
+            cols = list(dict.fromkeys(["minute", "expiry", "nearest_expiry"] + list(self.columns)))
+            select = ", ".join(f'"{c}"' for c in cols)
+        try:
+            return duckdb.query(f"SELECT {select} FROM '{path}' WHERE nearest_expiry <= {self.max_rank}").to_df()
+        except duckdb.Error as e:
+            logging.warning(f"Could not replay {path}: {e}")
+            return None
+
+    async def _pace(self, previous: Optional[str], minute: str):
+        if self.speed is None:
+            await asyncio.sleep(0)  # let the consumer run between bars
+            return
+        if previous is None:
+            return
+        gap = (datetime.datetime.strptime(minute, "%H:%M:%S") - datetime.datetime.strptime(previous, "%H:%M:%S")).total_seconds()
+        await asyncio.sleep(max(gap, 0.0) / self.speed)
+
+    async def run(self, queue: asyncio.Queue):
+        day = self.start_date
+        while day <= self.end_date:
+            data = self.load_day(day) if day.weekday() < 5 else None
+            if data is not None and not data.empty:
+                ranks = data[["nearest_expiry", "expiry"]].drop_duplicates()
+                expiries = {}
+                for rank, expiry in zip(ranks["nearest_expiry"], ranks["expiry"]):
+                    expiries.setdefault(int(rank), expiry)
+                await queue.put(DayStart(day, expiries))
+                previous = None
+                for minute, chain in minute_views(data).items():
+                    await self._pace(previous, minute)
+                    previous = minute
+                    await queue.put(Bar(day, minute, chain, time.perf_counter_ns()))
+                    self.bars_sent += 1
+                await queue.put(DayEnd(day))
+            day += timedelta(days=1)
+        await queue.put(None)
+
+
+class LocalGateway:
+    """
+    Stand-in order gateway: acknowledges every batch of fills immediately
+    and books it into the strategy's TradeBook.
+    """
+
+    def __init__(self):
+        self.orders = 0
+        self.fills = 0
+        self.acks = []  # (order_id, timestamp, n_fills) of every acknowledged batch
+
+    def submit(self, tb, batch: Dict):
+        self.orders += 1
+        self.fills += len(batch["symbols"])
+        tb.add_trades(**batch)
+        self.acks.append((self.orders, batch["timestamp"], len(batch["symbols"])))
+        return self.orders
+
+
+class LiveRunner:
+    """
+    Drives a strategy's on_bar from a feed queue with the positional cycle
+    rules of GenericStrategy.run: an open cycle follows its position_expiry
+    across days, a flat cycle is dropped at the end of the day and a new one
+    starts after an exit. Closed cycles are stored on the engine.
+    """
+
+    def __init__(self, data_dir: str, expiry_list_file: str, strategy_class, gateway: Optional[LocalGateway] = None,
+                 latency=None):
+        self.engine = GenericStrategy(data_dir, expiry_list_file)
+        self.engine.gateway = gateway
+        self.engine.latency = latency  # Optional latency.LatencyRecorder
+        self.strategy_class = strategy_class
+        self.strategy = None
+        self.expiries = {}
+        self.bars = 0
+        self.latency_ns = 0  # bar emitted -> on_bar returned, summed
+        self.max_latency_ns = 0
+        self.wall_ns = 0
+
+    def _new_cycle(self):
+        engine = self.engine
+        nearest = self.expiries.get(1)
+        if nearest is None:
+            return None
+        if str(engine.current_date) == str(nearest)[:10]:
+            nearest = self.expiries.get(2)
+        if nearest is None:
+            return None
+        engine.current_expiry = nearest
+        strategy = engine._new_strategy(self.strategy_class)
+        strategy.on_day_start(None)
+        return strategy
+
+    def on_bar(self, bar: Bar):
+        engine = self.engine
+        if self.strategy is None:
+            self.strategy = self._new_cycle()
+            if self.strategy is None:
+                return
+        strategy = self.strategy
+        expiry = strategy.position_expiry or strategy.current_expiry
+        chain = bar.chain[bar.chain["expiry"].to_numpy() == expiry]
+        if chain.empty:
+            return
+        if strategy.on_bar(chain, bar.minute):
+            strategy.on_day_end()
+            if strategy.tb.all_trades:
+                engine._store_tradebook(strategy.tb)
+            self.strategy = None
+
+    def on_day_end(self):
+        strategy = self.strategy
+        if strategy is None:
+            return
+        strategy.on_day_end()
+        if not strategy.tb.positions or not strategy.position_expiry:
+            self.strategy = None
+
+    async def run(self, queue: asyncio.Queue):
+        started = time.perf_counter_ns()
+        while True:
+            msg = await queue.get()
+            if msg is None:
+                break
+            if isinstance(msg, DayStart):
+                self.engine.current_date = msg.day
+                self.expiries = msg.expiries
+                if self.strategy is not None:
+                    self.strategy.current_date = msg.day
+                    self.strategy.atm_series = None
+                    self.strategy.on_day_start(None)
+            elif isinstance(msg, Bar):
+                latency = self.engine.latency
+                if latency is not None:
+                    latency.bar_start(msg.emitted_ns)
+                self.on_bar(msg)
+                if latency is not None:
+                    latency.bar_end()
+                elapsed = time.perf_counter_ns() - msg.emitted_ns
+                self.bars += 1
+                self.latency_ns += elapsed
+                self.max_latency_ns = max(self.max_latency_ns, elapsed)
+            else:
+                self.on_day_end()
+        if self.strategy is not None and self.strategy.tb.positions:
+            logging.info(f"replay ended with open positions in {self.strategy.position_expiry}, dropping the cycle")
+            self.strategy = None
+        self.wall_ns = time.perf_counter_ns() - started
+
+    def stats(self) -> Dict:
+        """
+        bars processed, throughput and bar-to-decision latency of the replay
+        """
+        seconds = self.wall_ns / 1e9
+        return {
+            "bars": self.bars,
+            "cycles": self.engine.cycles_closed,
+            "bars_per_sec": self.bars / seconds if seconds else 0.0,
+            "mean_latency_us": self.latency_ns / self.bars / 1e3 if self.bars else 0.0,
+            "max_latency_us": self.max_latency_ns / 1e3,
+        }
+
+
+async def replay(feed: ReplayFeed, runner: LiveRunner, queue_size: int = 1024) -> LiveRunner:
+    """
+    run a feed into a runner concurrently and return the runner
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    await asyncio.gather(feed.run(queue), runner.run(queue))
+    return runner
+
+
+def run_replay(data_dir: str, expiry_list_file: str, strategy_class, start_date: date, end_date: date,
+               speed: Optional[float] = None, gateway: Optional[LocalGateway] = None, latency=None) -> LiveRunner:
+    """
+    replay start_date..end_date through strategy_class and return the runner
+    (tradebooks in runner.engine.all_tradebooks, throughput in runner.stats())
+    """
+    feed = ReplayFeed(data_dir, start_date, end_date, speed=speed, columns=getattr(strategy_class, "columns", None))
+    runner = LiveRunner(data_dir, expiry_list_file, strategy_class, gateway=gateway or LocalGateway(), latency=latency)
+    return asyncio.run(replay(feed, runner))
@@ -0,0 +1,69 @@
+import os
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Optional
+
+SESSION_START = 9 * 60 + 15  # 09:15 in minutes since midnight
+PRICE_COLUMNS = ["call_close", "put_close"]
+
+
+def resample_chain(df: pd.DataFrame, bar_minutes: int) -> pd.DataFrame:
+    """
+    Aggregate a 1-minute chain to bar_minutes bars per (expiry, strike).
+    Bars are aligned to 09:15 and labelled with their last minute, so fills
+    at a bar happen at a real minute's close. call_close/put_close keep the
+    bar's last close and gain _open/_high/_low of the close; greeks, spot and
+    every other column are the bar's last row's value, NaN included (a
+    missing close is not filled from an earlier minute).
+    """
+    if bar_minutes <= 1:
+        return df
+    minute = df["minute"].astype(str)
+    of_day = minute.str.slice(0, 2).astype(np.int32) * 60 + minute.str.slice(3, 5).astype(np.int32)
+    df = df.assign(_bar=((of_day - SESSION_START) // bar_minutes).to_numpy())
+    df = df.sort_values(["expiry", "strike", "minute"], kind="stable")
+
+    keys = ["expiry", "strike", "_bar"]
+    grouped = df.groupby(keys, sort=False)
+    # rows are sorted by keys then minute, so these are each bar's first and last rows
+    out = df.drop_duplicates(keys, keep="last").set_index(keys)
+    first = df.drop_duplicates(keys, keep="first").set_index(keys)
+    for col in PRICE_COLUMNS:
+        if col in df:
+            out[col.replace("_close", "_open")] = first[col]
+            out[col.replace("_close", "_high")] = grouped[col].max()
+            out[col.replace("_close", "_low")] = grouped[col].min()
+    out = out.reset_index().drop(columns="_bar")
+    return out.sort_values(["expiry", "minute", "strike"], kind="stable").reset_index(drop=True)
+
+
+def resampled_path(path: str, bar_minutes: int, cache_dir: Optional[str] = None) -> str:
+    """
+    Path of the bar_minutes version of a daily chain file, building it on
+    first use. The cached file is keyed by the source's size and mtime, so
+    an updated source is resampled again.
+    """
+    if bar_minutes <= 1:
+        return path
+    st = os.stat(path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(path), ".bars")
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out = os.path.join(cache_dir, f"{stem}.{bar_minutes}m.{st.st_size:x}-{st.st_mtime_ns:x}.parquet")
+    if os.path.exists(out):
+        return out
+
+    os.makedirs(cache_dir, exist_ok=True)
+    bars = resample_chain(pd.read_parquet(path), bar_minutes)
+    # a temp name of our own: workers resampling the same day don't write over each other
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=f"{stem}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        bars.to_parquet(tmp, index=False)
+        os.replace(tmp, out)  # other workers never see a half-written file
+    except BaseException:
+        os.remove(tmp)
+        raise
+    logging.info(f"Resampled {path} to {bar_minutes}m bars in {out}")
+    return out
@@ -0,0 +1,170 @@
+import os
+import sys
+import pickle
+import hashlib
+import inspect
+import logging
+import tempfile
+from types import ModuleType
+from typing import Dict, List, Optional
+from pricing import file_hash
+
+
+def _local_modules(strategy_class, settings=()) -> List[ModuleType]:
+    """
+    the modules of the strategy's class hierarchy and every module they
+    import, directly or not, from the same directories (tradebook, orders,
+    ...), plus those defining the settings' classes (costs), in a stable order
+    """
+    roots = [sys.modules.get(cls.__module__) for cls in strategy_class.__mro__ if cls.__module__ != "builtins"]
+    roots = [m for m in roots if m is not None]
+    dirs = {os.path.dirname(os.path.abspath(m.__file__)) for m in roots if getattr(m, "__file__", None)}
+    for value in settings:
+        module = sys.modules.get(type(value).__module__)
+        if getattr(module, "__file__", None) and os.path.dirname(os.path.abspath(module.__file__)) in dirs:
+            roots.append(module)
+    seen = {}
+    stack = list(roots)
+    while stack:
+        module = stack.pop()
+        if module.__name__ in seen:
+            continue
+        seen[module.__name__] = module
+        for value in vars(module).values():
+            dep = value if isinstance(value, ModuleType) else sys.modules.get(getattr(value, "__module__", None) or "")
+            path = getattr(dep, "__file__", None)
+            if path and dep.__name__ not in seen and os.path.dirname(os.path.abspath(path)) in dirs:
+                stack.append(dep)
+    return [seen[name] for name in sorted(seen)]
+
+
+def strategy_fingerprint(strategy_class, params: Optional[Dict] = None, **settings) -> str:
+    """
+    sha1 over the strategy class's qualified name, the source of every
+    class in its hierarchy (so two strategies in one module differ), the
+    source of their modules (the engine included) and the repo modules they
+    import (fills, costs, exits), its parameters and any run settings that
+    change results (cost model, bar size, ...)
+    """
+    h = hashlib.sha1()
+    for cls in strategy_class.__mro__:
+        if cls is object:
+            continue
+        h.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+        try:
+            h.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            # classes without source (built at runtime): their plain attributes
+            h.update(repr(sorted((k, repr(v)) for k, v in vars(cls).items() if not callable(v))).encode())
+    for module in _local_modules(strategy_class, settings.values()):
+        h.update(module.__name__.encode())
+        try:
+            h.update(inspect.getsource(module).encode())
+        except (OSError, TypeError):
+            h.update(module.__name__.encode())
+    h.update(repr(sorted((params or {}).items())).encode())
+    for k in sorted(settings):
+        v = settings[k]
+        h.update(f"{k}={sorted(vars(v).items()) if hasattr(v, '__dict__') else v!r}".encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed store of closed cycles on disk. An entry is keyed by
+    the strategy fingerprint and the cycle's start (day and update_time),
+    and records the fingerprint of every day file the cycle read, so it is
+    only served while those files are unchanged. Day files are
+    fingerprinted by size and mtime, or by content with content_hash=True.
+    Entries are evicted least recently used first once the directory
+    exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30, content_hash: bool = False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+        self.hits = 0
+        self.misses = 0
+        self._day_fps = {}
+        self._bytes = None  # size of the entries, counted once and then kept up to date by put()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def day_fingerprint(self, path: str):
+        """
+        fingerprint of a day file, None if it doesn't exist
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        fp = (st.st_size, st.st_mtime_ns)
+        if not self.content_hash:
+            return fp
+        cached = self._day_fps.get(path)
+        if cached is None or cached[0] != fp:
+            cached = self._day_fps[path] = (fp, file_hash(path))
+        return cached[1]
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.cycle")
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError):
+            logging.warning(f"Dropping unreadable cache entry {path}")
+            os.remove(path)
+            self.misses += 1
+            return None
+        os.utime(path)  # recency for LRU eviction
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: Dict):
+        path = self._path(key)
+        # a temp name of our own: processes sharing the cache don't write over each other
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        total = self._total() - (os.path.getsize(path) if os.path.exists(path) else 0)
+        os.replace(tmp, path)
+        self._bytes = total + os.path.getsize(path)
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> List[tuple]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".cycle"):
+                st = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((st.st_mtime_ns, st.st_size, name))
+        return entries
+
+    def _total(self) -> int:
+        if self._bytes is None:
+            self._bytes = sum(size for _, size, _ in self._entries())
+        return self._bytes
+
+    def _evict(self):
+        """
+        drop least recently used entries until the cache fits in max_bytes;
+        the directory is only listed when put() finds it over the limit
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+        self._bytes = total
@@ -0,0 +1,166 @@
+import os
+import re
+import glob
+import logging
+from typing import Dict, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+def result_files(path: str) -> List[str]:
+    """
+    path and its part files (<path>.part1.parquet, ...), in write order
+    """
+    root, ext = os.path.splitext(path)
+    ext = ext or ".parquet"
+    part = re.compile(re.escape(root) + r"\.part(\d+)" + re.escape(ext) + "$")
+    parts = [(int(m.group(1)), p) for p in glob.glob(glob.escape(root) + ".part*" + ext) for m in [part.match(p)] if m]
+    return ([path] if os.path.exists(path) else []) + [p for _, p in sorted(parts)]
+
+
+def read_results(path: str) -> pd.DataFrame:
+    """
+    every cycle a ParquetResultsSink wrote to path, its part files included
+    """
+    files = result_files(path)
+    if not files:
+        raise FileNotFoundError(path)
+    return pq.read_table(files, schema=ParquetResultsSink.schema).to_pandas()
+
+
+class ParquetResultsSink:
+    """
+    Streams closed cycles (one TradeBook each) into a single parquet file.
+    Trades are buffered and written as one row group every
+    cycles_per_row_group cycles, so memory stays flat over long runs.
+    checkpoint() finalizes the file so far; later cycles then go to
+    <path>.part1.parquet, <path>.part2.parquet, ... Read the output with
+    read_results(path) (or analytics.summarize(path)), which picks up
+    every part.
+    """
+
+    schema = pa.schema([
+        ("cycle_id", pa.int32()),
+        ("ts", pa.string()),
+        ("symbol", pa.string()),
+        ("price", pa.float64()),
+        ("qty", pa.int32()),
+        ("order", pa.string()),
+        ("expiry", pa.string()),
+        ("strike", pa.float64()),
+        ("raw_price", pa.float64()),
+        ("slippage", pa.float64()),
+        ("charges", pa.float64()),
+    ])
+
+    def __init__(self, path: str, cycles_per_row_group: int = 50):
+        self.path = path
+        self.cycles_per_row_group = cycles_per_row_group
+        self.cycles_written = 0
+        self._writer = None
+        self._part = 0
+        self._buffer: Dict[str, List] = {name: [] for name in self.schema.names}
+        self._buffered_cycles = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """
+        cycles buffered but not yet written
+        """
+        return self._buffered_cycles
+
+    def _part_path(self, part: int) -> str:
+        if part == 0:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.part{part}{ext or '.parquet'}"
+
+    def files(self) -> List[str]:
+        """
+        the finalized (and current) files holding the written cycles, in order
+        """
+        return [p for p in map(self._part_path, range(self._part + 1)) if os.path.exists(p)]
+
+    def checkpoint(self) -> int:
+        """
+        flush and finalize the current file so every cycle written so far
+        survives a crash; later cycles go to the next part file. Returns
+        the part later cycles are written to, for resume().
+        """
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._part += 1
+        return self._part
+
+    def resume(self, part: int) -> None:
+        """
+        continue a checkpointed run at part, dropping the part files a
+        crashed run wrote after its checkpoint (their cycles run again)
+        """
+        self._part = part
+        while os.path.exists(self._part_path(part)):
+            os.remove(self._part_path(part))
+            part += 1
+
+    def write_cycle(self, tb) -> int:
+        """
+        Buffer all trades of a closed TradeBook, flushing a row group when
+        enough cycles have accumulated. Returns the cycle_id given to it.
+        """
+        cycle_id = self.cycles_written
+        for trade in tb.all_trades:
+            self._buffer["cycle_id"].append(cycle_id)
+            self._buffer["ts"].append(str(trade["ts"]))
+            self._buffer["symbol"].append(trade["symbol"])
+            self._buffer["price"].append(float(trade["price"]))
+            self._buffer["qty"].append(int(trade["qty"]))
+            self._buffer["order"].append(trade["order"])
+            self._buffer["expiry"].append(str(trade["expiry"]) if trade.get("expiry") is not None else None)
+            self._buffer["strike"].append(float(trade["strike"]) if trade.get("strike") is not None else None)
+            # cost columns are only there when the run used a cost model
+            self._buffer["raw_price"].append(trade.get("raw_price"))
+            self._buffer["slippage"].append(trade.get("slippage"))
+            self._buffer["charges"].append(trade.get("charges"))
+
+        self.cycles_written += 1
+        self._buffered_cycles += 1
+        if self._buffered_cycles >= self.cycles_per_row_group:
+            self.flush()
+        return cycle_id
+
+    def flush(self) -> None:
+        """
+        write buffered cycles as one row group
+        """
+        if not self._buffered_cycles:
+            return
+        table = pa.Table.from_pydict(self._buffer, schema=self.schema)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._part_path(self._part), self.schema, compression="zstd")
+        self._writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        logging.info(f"Flushed {self._buffered_cycles} cycles ({table.num_rows} trades) to {self._part_path(self._part)}")
+        self._buffer = {name: [] for name in self.schema.names}
+        self._buffered_cycles = 0
+
+    def close(self) -> None:
+        """
+        flush what is left and finalize the file
+        """
+        self.flush()
+        if self._writer is None:
+            if self.files():
+                return
+            # No cycles at all, still leave a valid (empty) file behind
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd")
+        self._writer.close()
+        self._writer = None
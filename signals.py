@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def next_band_crossing(spot: np.ndarray, anchor: float, band: float, start: int = 0, chunk: int = 32) -> int:
+    """
+    Index of the first minute at or after start where spot leaves the band,
+    i.e. spot >= anchor + band or spot <= anchor - band. Returns -1 if it
+    never does. The search runs on growing chunks so a crossing close to
+    start doesn't pay for a scan of the whole day.
+    """
+    upper = anchor + band
+    lower = anchor - band
+    n = len(spot)
+    i = start
+    while i < n:
+        window = spot[i:i + chunk]
+        hits = np.flatnonzero((window >= upper) | (window <= lower))
+        if len(hits):
+            return i + int(hits[0])
+        i += chunk
+        chunk *= 2
+    return -1
+
@@ -188,6 +188,7 @@ class OutSellStrategy(GenericStrategy):
         
         if pnl:
             sum_pnl=sum(pnl.values())
+            self.record_mtm(timestamp, sum_pnl)
 
             #print(sum_pnl,timestamp)
 
@@ -265,63 +266,22 @@ class OutSellStrategy(GenericStrategy):
     
         
    
-    def run_strategy(self, current_data: pd.DataFrame) -> bool:
+    def on_bar(self, bar: pd.DataFrame, timestamp: str) -> bool:
         """
-        Run the strategy for the current data
+        One minute of the chain: enter at the open when flat, otherwise check
+        the stop/target
         Returns: True if strategy has exited position, False if still holding or no position
         """
-        #print(current_data.columns)
-        for timestamp in current_data["minute"].unique(): 
-            self.current_time=timestamp
-            #print(type(timestamp))
-            
-            current_data_at_time = current_data[current_data["minute"] == timestamp]
-
-            strike_data = dict(zip(current_data_at_time['strike'], [{'put_close': put, 'put_delta': delta, 'put_gamma': gamma, 'theta': theta, 'vega': vega} 
-                                      for put, delta, gamma, theta, vega in zip(current_data_at_time['put_close'], current_data_at_time['put_delta'], 
-                                      current_data_at_time['put_gamma'], current_data_at_time['put_theta'], current_data_at_time['put_vega'])]))
-
-            
-            if not self.tb.open_positions:
-                if not self.exit_signal: 
-                    #print("coming for entry", timestamp)  # Only try to enter if we haven't just exited
-                    self.entry(current_data_at_time, timestamp)
-            
-            elif self.tb.open_positions:
-                #print(timestamp)
-                current_position = self.tb.positions
+        self.current_time=timestamp
 
-                #print(current_position)
-
-               
-
-                #print(current_position)
-               
-                
-                # Check for adjustments
-                #adjust_params = self.adjust(current_position, current_data, timestamp)
-                #if adjust_params and adjust_params['action'] == 'roll':
-                 #   logging.info(
-                  #      f"Rolling position: Delta {adjust_params['current_delta']:.2f} -> "
-                   #     f"{adjust_params['new_delta']:.2f}, {adjust_params['days_to_expiry']:.1f} days to expiry"
-                    #)
-                    # Exit the current position before rolling
-                #current_data_at_time = current_data[current_data["minute"] == timestamp]
-                #self.exit_position(
-                 #   timestamp=timestamp,
-                  #  symbol=f"{self.selected_strike}PE",
-                   # exit_price=current_data_at_time['put_close'].values[0],  # Use .values[0] to get scalar value
-                   # reason=f"Rolling from delta {adjust_params['current_delta']:.2f}"
-                #)
-                #return True  # Return true since we exited the position
-                
-                # Check for exit
-                #if self.exit(current_position, current_data_at_time, timestamp):
-                #try:
-                if self.adjust(current_position,current_data_at_time,timestamp):
-                    return True 
-                #except:
-                 #   continue # Return true since we exited the position
+        if not self.tb.open_positions:
+            if not self.exit_signal: 
+                self.entry(bar, timestamp)
+        
+        elif self.tb.open_positions:
+            current_position = self.tb.positions
+            if self.adjust(current_position,bar,timestamp):
+                return True 
 
         # Return false if we're still holding position or didn't enter
         return False
@@ -17,4 +17,21 @@ class Straddle :
         self.callM2M = 0
         self.putM2M = 0
         self.straddle=0
-        self.straddle_sl=0
\ No newline at end of file
+        self.straddle_sl=0
+        self.hedge=0
+        self.series=None # ATMSeries of the day the straddle lives in
+        self.index=None # minute index into series
+
+    def load(self, series, index):
+        """
+        Open the straddle from a precomputed ATMSeries row in O(1)
+        """
+        self.series = series
+        self.index = index
+        self.OpenTime = series.minutes[index]
+        self.strike = series["strike"][index]
+        self.callOpenPrc = series["call_close"][index]
+        self.putOpenPrc = series["put_close"][index]
+        self.straddle = series["straddle"][index]
+        self.hedge = series["hedge"][index]
+        return self
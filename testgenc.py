@@ -21,23 +21,13 @@ start_date=datetime.date(2024,1,1)
 end_date=datetime.date(2025,2,1)
 class_=1
 from new_strategy import OutSellStrategy
-strategy.run(start_date=start_date,end_date=end_date,strategy_class=OutSellStrategy)
+from results_sink import ParquetResultsSink, read_results
 
-print("completed")
-empty_df=[]
-
-print(strategy.all_tradebooks)
-
-for strat in strategy.all_tradebooks:
-    print("here")
-    #orderbook1 = pd.DataFrame(strat.tb.orders)
-    orderbook1 = pd.DataFrame(strat._all_trades)
-    print(orderbook1)
-    empty_df.append(orderbook1)
-
-final_df = pd.concat(empty_df, ignore_index=True) if empty_df else pd.DataFrame()
-
-
-final_df.to_csv("strategy_positional.csv")
+# Cycles are streamed to parquet as each one closes, one row group per 50 cycles
+sink = ParquetResultsSink("strategy_positional.parquet", cycles_per_row_group=50)
+strategy.run(start_date=start_date,end_date=end_date,strategy_class=OutSellStrategy,results_sink=sink)
 
+print("completed")
 
+final_df = read_results("strategy_positional.parquet")  # the sink's part files included
+print(final_df)
@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the repo's modules are flat at the root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 1, 19)
+
+
+@pytest.fixture(scope="session")
+def chain(tmp_path_factory):
+    """
+    (data_dir, expiry_list_file) of a small synthetic NIFTY-like chain:
+    weekly Thursday expiries, three live at a time, 51 strikes, a random
+    walk spot and straddle-shaped premiums, every weekday of START..END
+    """
+    root = tmp_path_factory.mktemp("chain")
+    rng = np.random.default_rng(0)
+    expiries = [datetime.date(2024, 1, 4) + datetime.timedelta(days=7 * i) for i in range(6)]
+    minutes = np.array([f"{9 + (15 + i) // 60:02d}:{(15 + i) % 60:02d}:00" for i in range(375)])
+    strikes = np.arange(20500, 23050, 50)
+    spot0 = 21700.0
+    day = START
+    while day <= END:
+        if day.weekday() < 5:
+            spot = spot0 + np.cumsum(rng.normal(0, 8, len(minutes)))
+            spot0 = spot[-1]
+            frames = []
+            for rank, expiry in enumerate([e for e in expiries if e >= day][:3], 1):
+                tte = max((expiry - day).days, 0.2)
+                s = np.repeat(spot, len(strikes))
+                k = np.tile(strikes, len(minutes))
+                atm = 50 * np.round(s / 50)
+                tv = 120 * np.sqrt(tte / 7) * np.exp(-((k - s) / 300) ** 2)
+                pos = ((k - atm) // 50).astype(int)
+                frames.append(pd.DataFrame({
+                    "minute": np.repeat(minutes, len(strikes)), "expiry": str(expiry), "strike": k, "spot_price": s,
+                    "call_close": np.round(np.maximum(s - k, 0) + tv + 0.05, 2),
+                    "put_close": np.round(np.maximum(k - s, 0) + tv + 0.05, 2),
+                    "put_position": 1 - pos, "call_position": pos,
+                    "put_delta": -0.5, "put_iv": 0.12, "call_delta": 0.5, "call_iv": 0.12,
+                    "put_gamma": 0.001, "put_theta": -5.0, "put_vega": 10.0,
+                    "call_gamma": 0.001, "call_theta": -5.0, "call_vega": 10.0,
+                    "tte": tte, "nearest_expiry": rank, "monthly_expiry_number": int(expiry.day > 24),
+                }))
+            pd.concat(frames, ignore_index=True).to_parquet(root / f"{day}.parquet")
+        day += datetime.timedelta(days=1)
+    expiry_list = root / "expiries"
+    expiry_list.write_text(json.dumps([f"{e} 00:00:00" for e in expiries]))
+    return str(root), str(expiry_list)
@@ -0,0 +1,30 @@
+from new_strategy import OutSellStrategy
+from result_cache import ResultCache, strategy_fingerprint
+
+
+class Plain(OutSellStrategy):
+    pass
+
+
+class NoTrade(OutSellStrategy):
+    def entry(self, data, timestamp):
+        return None
+
+
+def test_classes_in_one_module_get_different_keys():
+    assert strategy_fingerprint(Plain) != strategy_fingerprint(NoTrade)
+
+
+def test_fingerprint_is_stable():
+    assert strategy_fingerprint(Plain, {"flag": 1}) == strategy_fingerprint(Plain, {"flag": 1})
+    assert strategy_fingerprint(Plain, {"flag": 1}) != strategy_fingerprint(Plain, {"flag": 2})
+
+
+def test_put_get_and_evict(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1)
+    cache.put("a", {"x": 1})
+    assert cache.get("a") is None  # over max_bytes, evicted right away
+    cache = ResultCache(str(tmp_path))
+    cache.put("b", {"x": 2})
+    assert cache.get("b") == {"x": 2}
+    assert not [n for n in tmp_path.iterdir() if n.suffix == ".tmp"]
@@ -0,0 +1,40 @@
+import analytics
+from conftest import START, END
+from genc import GenericStrategy
+from new_strategy import OutSellStrategy
+from results_sink import ParquetResultsSink, read_results
+from tradebook import TradeBook
+
+
+def _cycle(i):
+    tb = TradeBook()
+    tb.add_trade(f"2024-01-0{i + 1}09:15:00", "21700|PE", 100.0, 1, "S", expiry="2024-01-11", strike=21700)
+    tb.add_trade(f"2024-01-0{i + 1}15:29:00", "21700|PE", 90.0, 1, "B", expiry="2024-01-11", strike=21700)
+    return tb
+
+
+def test_checkpointed_sink_reads_back_every_cycle(tmp_path):
+    path = str(tmp_path / "res.parquet")
+    sink = ParquetResultsSink(path, cycles_per_row_group=2)
+    for i in range(5):
+        sink.write_cycle(_cycle(i))
+        sink.checkpoint()
+    sink.close()
+    assert len(sink.files()) == 5
+    assert len(read_results(path)) == 10
+    assert analytics.summarize(path)["n_cycles"] == 5
+
+
+def test_checkpointed_run_keeps_every_trade(chain, tmp_path):
+    data_dir, expiry_list = chain
+    plain = GenericStrategy(data_dir, expiry_list)
+    plain.run(START, END, OutSellStrategy)
+    trades = sum(len(tb.all_trades) for tb in plain.all_tradebooks)
+    assert len(plain.all_tradebooks) > 1
+
+    path = str(tmp_path / "res.parquet")
+    engine = GenericStrategy(data_dir, expiry_list)
+    engine.run(START, END, OutSellStrategy, results_sink=ParquetResultsSink(path, cycles_per_row_group=2),
+               checkpoint_path=str(tmp_path / "run.ckpt"))
+    assert len(read_results(path)) == trades
+    assert analytics.summarize(path)["n_cycles"] == len(plain.all_tradebooks)
@@ -1,5 +1,6 @@
 from collections import Counter, defaultdict
-from typing import Dict, List
+from typing import Dict, List, Optional
+from orders import split_symbol
 
 
 class TradeBook:
@@ -7,12 +8,14 @@ class TradeBook:
     TradeBook class to manage trades, positions, and values
     """
 
-    def __init__(self, name="tradebook"):
+    def __init__(self, name="tradebook", cost_model=None):
         self._name = name
         self._trades = defaultdict(list)
         self._values = Counter()
         self._positions = Counter()
         self._all_trades = []
+        self.cost_model = cost_model  # Optional costs.CostModel applied to every fill
+        self._charges = 0.0
 
     def __repr__(self):
         string = "{name} with {count} entries and {pos} positions"
@@ -49,6 +52,13 @@ class TradeBook:
         """
         return self._values
 
+    @property
+    def charges(self) -> float:
+        """
+        return the total charges of all fills (0 without a cost model)
+        """
+        return self._charges
+
     @property
     def o(self) -> int:
         """
@@ -82,6 +92,15 @@ class TradeBook:
         o = {"B": 1, "S": -1}
         order = order.upper()[0]
         q = qty * o[order]
+        costs = {}
+        if self.cost_model is not None:
+            strike = kwargs.get("strike")
+            filled = self.cost_model.apply(
+                [price], [q], [order == "B"], strike=[float(strike)] if strike is not None else None
+            )
+            costs = {k: float(v[0]) for k, v in filled.items()}
+            price = costs.pop("price")
+            self._charges += costs["charges"]
         dct = {
             "ts": timestamp,
             "symbol": symbol,
@@ -90,12 +109,64 @@ class TradeBook:
             "order": order,
         }
         dct.update(kwargs)
+        dct.update(costs)
         self._trades[symbol].append(dct)
         self._all_trades.append(dct)
         self._positions.update({symbol: q})
         value = q * price * -1
         self._values.update({symbol: value})
 
+    def add_trades(
+        self,
+        timestamp: str,
+        symbols: List[str],
+        prices: List[float],
+        qtys: List[float],
+        orders: List[str],
+        market: Dict = None,
+        **kwargs,
+    ) -> None:
+        """
+        Add several fills at one timestamp in a single batch.
+        kwargs hold one value per fill, e.g. expiry=[...], strike=[...]
+        market optionally holds per-fill spot/spread arrays for the cost model
+        """
+        o = {"B": 1, "S": -1}
+        positions: Dict = Counter()
+        values: Dict = Counter()
+        sides = [order.upper()[0] for order in orders]
+        signed = [qtys[i] * o[side] for i, side in enumerate(sides)]
+        costs = None
+        if self.cost_model is not None:
+            market = market or {}
+            strikes = kwargs.get("strike")
+            costs = self.cost_model.apply(
+                prices, signed, [side == "B" for side in sides],
+                strike=[float(k) for k in strikes] if strikes is not None else None,
+                spot=market.get("spot"), spread=market.get("spread"),
+            )
+            prices = costs.pop("price")
+            self._charges += float(costs["charges"].sum())
+        for i, symbol in enumerate(symbols):
+            order = sides[i]
+            q = signed[i]
+            dct = {
+                "ts": timestamp,
+                "symbol": symbol,
+                "price": prices[i],
+                "qty": q,
+                "order": order,
+            }
+            dct.update({k: v[i] for k, v in kwargs.items()})
+            if costs is not None:
+                dct.update({k: float(v[i]) for k, v in costs.items()})
+            self._trades[symbol].append(dct)
+            self._all_trades.append(dct)
+            positions[symbol] += q
+            values[symbol] += q * prices[i] * -1
+        self._positions.update(positions)
+        self._values.update(values)
+
     def clear(self) -> None:
         """
         clear all existing entries
@@ -108,7 +179,8 @@ class TradeBook:
     def remove_trade(self, symbol: str):
         """
         Remove the last trade for the given symbol
-        and adjust the positions and values
+        and adjust the positions, values and charges. The value is
+        reversed at the filled price, so the fill's slippage goes with it.
         """
         trades = self._trades.get(symbol)
         if trades:
@@ -118,21 +190,24 @@ class TradeBook:
                 value = q * trade["price"] * -1
                 self._positions.update({symbol: q})
                 self._values.update({symbol: value})
+                self._charges -= trade.get("charges") or 0.0
 
-    def mtm(self, prices: Dict[str, float]) -> Dict[str, float]:
+    def mtm(self, prices: Dict[str, float], expiry_prices: Optional[Dict[str, Dict]] = None) -> Dict[str, float]:
         """
         Calculate the mtm for the given positions given
         the current prices
         price
             current prices of the symbols
+        expiry_prices
+            prices by expiry for legs traded as "strike|CE|expiry"
         """
        
         values: Dict = Counter()
         for k, v in self.positions.items():
             #print(k,v)
-            strike, option_type = k.split("|")
+            strike, option_type, expiry = split_symbol(k)
             if abs(v) > 0:
-                ltps = prices.get(int(strike))
+                ltps = (expiry_prices[expiry] if expiry else prices).get(strike)
                 index_=0 if option_type=="CE" else 1
                 ltp=ltps[index_]
                 #print(ltp[index_],"sdd",index_)